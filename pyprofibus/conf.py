@@ -188,6 +188,7 @@ class PbConf(object):
 				raise ValueError("Invalid master_addr")
 
 			self.slaveConfs = []
+			gsds = {}
 			for section in p.sections():
 				m = self.__reSlave.match(section)
 				if not m:
@@ -197,7 +198,12 @@ class PbConf(object):
 				s.index = index
 				s.name = get(section, "name", section)
 				s.addr = getint(section, "addr")
-				s.gsd = loadGsd(get(section, "gsd"), self.debug)
+				gsdName = get(section, "gsd")
+				if gsdName in gsds:
+					# Don't parse the same GSD file again.
+					s.gsd = gsds[gsdName].duplicate()
+				else:
+					s.gsd = gsds[gsdName] = loadGsd(gsdName, self.debug)
 				s.syncMode = getboolean(section, "sync_mode",
 							fallback=False)
 				s.freezeMode = getboolean(section, "freeze_mode",
@@ -113,12 +113,10 @@ class DpTelegram(object):
 	def toFdlTelegram(self):
 		du = self.getDU()
 
-		dae = bytearray()
-		if self.dsap is not None:
-			dae.append(self.dsap)
-		sae = bytearray()
-		if self.ssap is not None:
-			sae.append(self.ssap)
+		# Use the shared empty bytes object, if there is no SAP.
+		dsap, ssap = self.dsap, self.ssap
+		dae = b"" if dsap is None else bytearray((dsap,))
+		sae = b"" if ssap is None else bytearray((ssap,))
 
 		le = len(du) + len(dae) + len(sae)
 		if le == 0:
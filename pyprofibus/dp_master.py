@@ -57,10 +57,10 @@ class DpSlaveState(object):
 	}
 
 	__slots__ = (
-		"__nextState",
-		"__prevState",
+		"__justEntered",
 		"__state",
-		"__stateTimeout",
+		"__stateDeadline",
+		"__stateTimeLimit",
 		"dxStartTime",
 		"dxCount",
 		"dxCycleRunning",
@@ -70,7 +70,7 @@ class DpSlaveState(object):
 		"fromSlaveData",
 		"toSlaveData",
 		"pendingReq",
-		"pendingReqTimeout",
+		"pendingReqDeadline",
 		"rxQueue",
 		"shortAckReceived",
 		"slaveDesc",
@@ -84,19 +84,18 @@ class DpSlaveState(object):
 		self.faultDeb = FaultDebouncer()
 
 		self.__state = self._STATE_INVALID
-		self.__nextState = self._STATE_INVALID
-		self.__prevState = self._STATE_INVALID
-		self.__stateTimeout = TimeLimit()
+		self.__justEntered = False
+		self.__stateDeadline = 0.0
+		self.__stateTimeLimit = TimeLimit.UNLIMITED
 
 		# Context for FC-Bit toggeling
 		self.fcb = FdlFCB()
 		
 		self.setState(self.STATE_INIT)
-		self.applyState()
 
 		# Currently running request telegram
 		self.pendingReq = None
-		self.pendingReqTimeout = TimeLimit()
+		self.pendingReqDeadline = 0.0
 		self.shortAckReceived = False
 
 		# Data_Exchange context
@@ -121,41 +120,46 @@ class DpSlaveState(object):
 	def getState(self):
 		return self.__state
 
-	def getNextState(self):
-		return self.__nextState
-
 	def setState(self, state, stateTimeLimit=None):
 		if stateTimeLimit is None:
 			stateTimeLimit = self.stateTimeLimits[state]
 		if state == self.STATE_INIT:
 			self.dxCycleRunning = False
 			self.fcb.resetFCB()
-		self.__nextState = state
-		self.__stateTimeout.start(stateTimeLimit)
+		if state != self.__state:
+			# Enter the new state.
+			# It becomes active immediately, but the state's
+			# handler only sees it as entered on its next run.
+			if self.__state != self._STATE_INVALID:
+				self.master._slaveStateChanged(self, state)
+			self.__state = state
+			self.__justEntered = True
+		self.restartStateTimeout(stateTimeLimit)
 		self.master.phy.clearTxQueueAddr(self.slaveDesc.slaveAddr)
 		self.master._releaseSlave(self)
 
-	def applyState(self):
-		# Enter the new state
-		self.__prevState, self.__state = self.__state, self.__nextState
-
-		# Handle state switch
-		if self.stateJustEntered():
-			self.pendingReq = None
-
 	def stateJustEntered(self):
 		# Returns True, if the state was just entered.
-		return self.__prevState != self.__state
-
-	def stateIsChanging(self):
-		# Returns True, if the state was just changed.
-		return self.__nextState != self.__state
+		# This must be called once on each run of the state handler.
+		if self.__justEntered:
+			self.__justEntered = False
+			self.pendingReq = None
+			return True
+		return False
 
-	def restartStateTimeout(self, timeout = None):
-		self.__stateTimeout.start(timeout)
+	def restartStateTimeout(self, timeout=None, now=None):
+		if timeout is None:
+			timeout = self.__stateTimeLimit
+		self.__stateTimeLimit = timeout
+		if timeout < 0:
+			self.__stateDeadline = float("inf") # Unlimited
+		else:
+			if now is None:
+				now = monotonic_time()
+			self.__stateDeadline = now + timeout
 
-	def stateHasTimeout(self):
-		return self.__stateTimeout.exceed()
+	def stateHasTimeout(self, now):
+		return now >= self.__stateDeadline
 
 class DpSlaveDesc(object):
 	"""Static descriptor data of a DP slave that
@@ -176,6 +180,9 @@ class DpSlaveDesc(object):
 		"userData",
 		"setPrmTelegram",
 		"chkCfgTelegram",
+		"fdlStatReqTelegram",
+		"slaveDiagReqTelegram",
+		"dataExReqTelegram",
 	)
 
 	def __init__(self, slaveConf=None):
@@ -202,6 +209,12 @@ class DpSlaveDesc(object):
 					da=self.slaveAddr,
 					sa=None)
 
+		# The request telegrams used by the master state machine.
+		# These are created by the DPM on addSlave().
+		self.fdlStatReqTelegram = None
+		self.slaveDiagReqTelegram = None
+		self.dataExReqTelegram = None
+
 	def setCfgDataElements(self, cfgDataElements):
 		"""Sets DpCfgDataElement()s from the specified list
 		in the Chk_Cfg telegram.
@@ -269,6 +282,12 @@ class DpSlaveDesc(object):
 	def setMasterOutData(self, data):
 		"""Set the master-out-data that will be sent the
 		next time we are able to send something to that slave.
+		data should be bytes or bytearray.
+		Other sequences of integers are converted to bytearray.
+		If this is called multiple times before the data could be sent,
+		only the data from the last call is sent.
+		A bytes or bytearray object is used without copying it.
+		Its size must not be changed until it has been sent.
 		"""
 		self.dpm._setToSlaveData(self, data)
 
@@ -308,7 +327,6 @@ class DpMaster(object):
 	__slots__ = (
 		"__runTimer",
 		"__runCount",
-		"__haveToken",
 		"__runNextSlaveIndex",
 		"__slaveDescs",
 		"__slaveDescsList",
@@ -350,18 +368,20 @@ class DpMaster(object):
 		self.__slaveDescsList = []
 		self.__runNextSlaveIndex = 0
 
-		# Do we have the token?
-		self.__haveToken = True
-
 		self.__slowDown = False
 		self.__slowDownUntil = monotonic_time()
 		self.__slowDownFact = 1
 
-	def __debugMsg(self, msg):
+	def __debugMsg(self, msg, *args):
+		# The message is only formatted, if debugging is enabled.
 		if self.debug:
+			if args:
+				msg = msg % args
 			print("DPM%d: %s" % (self.dpmClass, msg))
 
-	def __errorMsg(self, msg):
+	def __errorMsg(self, msg, *args):
+		if args:
+			msg = msg % args
 		print("DPM%d:  >ERROR<  %s" % (self.dpmClass, msg))
 
 	def __masterSlowDown(self):
@@ -370,7 +390,7 @@ class DpMaster(object):
 		"""
 		self.__slowDown = True
 		self.__slowDownUntil = monotonic_time() + (0.01 * self.__slowDownFact)
-		self.__debugMsg("Slow down factor = %d" % self.__slowDownFact)
+		self.__debugMsg("Slow down factor = %d", self.__slowDownFact)
 		self.__slowDownFact = min(self.__slowDownFact + 1, 10)
 
 	def destroy(self):
@@ -390,16 +410,25 @@ class DpMaster(object):
 		   slaveAddr in self.__slaveStates:
 			raise DpError("Slave %d is already registered." % slaveAddr)
 		slaveDesc.dpm = self
+
+		# Prepare the request telegrams that are periodically sent
+		# to the slave. They are re-used for every request.
+		slaveDesc.fdlStatReqTelegram = FdlTelegram_FdlStat_Req(
+			da=slaveAddr, sa=self.masterAddr)
+		slaveDesc.slaveDiagReqTelegram = DpTelegram_SlaveDiag_Req(
+			da=slaveAddr, sa=self.masterAddr)
+		slaveDesc.dataExReqTelegram = DpTelegram_DataExchange_Req(
+			da=slaveAddr, sa=self.masterAddr)
+
 		self.__slaveDescs[slaveAddr] = slaveDesc
 		self.__slaveStates[slaveAddr] = DpSlaveState(self, slaveDesc)
 
-		# Rebuild the slave desc list.
-		self.__slaveDescsList = [
-			desc
-			for addr, desc in sorted(self.__slaveDescs.items(),
-						 key=lambda x: x[0])
-			if addr != FdlTelegram.ADDRESS_MCAST
-		]
+		# Insert the slave into the address sorted slave desc list.
+		slaveDescsList = self.__slaveDescsList
+		index = len(slaveDescsList)
+		while index > 0 and slaveDescsList[index - 1].slaveAddr > slaveAddr:
+			index -= 1
+		slaveDescsList.insert(index, slaveDesc)
 
 		self.__runNextSlaveIndex = 0
 
@@ -423,19 +452,26 @@ class DpMaster(object):
 		except ProfibusError as e:
 			slave.pendingReq = None
 			self.__masterSlowDown()
-			self.__debugMsg(str(e))
+			self.__debugMsg("%s", e)
 			return False
 		self.__slowDownFact = 1
-		slave.pendingReqTimeout.start(timeout)
+		slave.pendingReqDeadline = monotonic_time() + timeout
 		return True
 
 	def _releaseSlave(self, slave):
 		self.phy.releaseBus()
 
-	def __runSlave_init(self, slave):
+	def _slaveStateChanged(self, slave, state):
+		self.__debugMsg("slave[%02X].state --> '%s'",
+				slave.slaveDesc.slaveAddr,
+				slave.state2name[state])
+
+	def __runSlave_init(self, slave, now):
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		if slave.stateJustEntered():
-			self.__debugMsg("Trying to initialize slave %d..." % (
-				slave.slaveDesc.slaveAddr))
+			self.__debugMsg("Trying to initialize slave %d...",
+				slaveAddr)
 			slave.flushRxQueue()
 		else:
 			for telegram in slave.getRxQueue():
@@ -444,22 +480,22 @@ class DpMaster(object):
 					stype = telegram.fc & FdlTelegram.FC_STYPE_MASK
 					if telegram.fc & FdlTelegram.FC_REQ:
 						self.__debugMsg("Slave %d replied with "
-								"request bit set." %\
-								slave.slaveDesc.slaveAddr)
+								"request bit set.",
+								slaveAddr)
 					elif stype != FdlTelegram.FC_SLAVE:
 						self.__debugMsg("Device %d is not a slave. "
-								"Detected type: 0x%02X" % (
-								slave.slaveDesc.slaveAddr,
-								stype))
+								"Detected type: 0x%02X",
+								slaveAddr,
+								stype)
 					else:
 						slave.setState(slave.STATE_WDIAG)
 						return None
 				else:
 					self.__debugMsg("Slave %d replied with a "
-						"weird telegram:\n%s" % str(telegram))
+						"weird telegram:\n%s", telegram)
 
 		if (not slave.pendingReq or
-		    slave.pendingReqTimeout.exceed()):
+		    now >= slave.pendingReqDeadline):
 			# Reset fault debounce counter.
 			slave.faultDeb.reset()
 
@@ -467,19 +503,19 @@ class DpMaster(object):
 			slave.fcb.enableFCB(False)
 
 			ok = self.__send(slave,
-					 telegram=FdlTelegram_FdlStat_Req(
-						da=slave.slaveDesc.slaveAddr,
-						sa=self.masterAddr),
+					 telegram=slaveDesc.fdlStatReqTelegram,
 					 timeout=0.01)
 			if not ok:
 				self.__debugMsg("FdlStat_Req failed")
 				return None
 		return None
 
-	def __runSlave_waitDiag(self, slave):
+	def __runSlave_waitDiag(self, slave, now):
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		if slave.stateJustEntered():
-			self.__debugMsg("Requesting Slave_Diag from slave %d..." %\
-				slave.slaveDesc.slaveAddr)
+			self.__debugMsg("Requesting Slave_Diag from slave %d...",
+				slaveAddr)
 			slave.flushRxQueue()
 		else:
 			for telegram in slave.getRxQueue():
@@ -488,28 +524,28 @@ class DpMaster(object):
 					return None
 				else:
 					self.__debugMsg("Received spurious "
-						"telegram:\n%s" % str(telegram))
+						"telegram:\n%s", telegram)
 
 		if (not slave.pendingReq or
-		    slave.pendingReqTimeout.exceed()):
+		    now >= slave.pendingReqDeadline):
 			# Enable the FCB bit.
 			slave.fcb.enableFCB(True)
 
 			# Send a SlaveDiag request
 			ok = self.__send(slave,
-					 telegram=DpTelegram_SlaveDiag_Req(
-						da=slave.slaveDesc.slaveAddr,
-						sa=self.masterAddr),
+					 telegram=slaveDesc.slaveDiagReqTelegram,
 					 timeout=0.05)
 			if not ok:
 				self.__debugMsg("SlaveDiag_Req failed")
 				return None
 		return None
 
-	def __runSlave_waitPrm(self, slave):
+	def __runSlave_waitPrm(self, slave, now):
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		if slave.stateJustEntered():
-			self.__debugMsg("Sending Set_Prm to slave %d..." %\
-				slave.slaveDesc.slaveAddr)
+			self.__debugMsg("Sending Set_Prm to slave %d...",
+				slaveAddr)
 			slave.flushRxQueue()
 		else:
 			if slave.shortAckReceived:
@@ -518,21 +554,23 @@ class DpMaster(object):
 				return None
 
 		if (not slave.pendingReq or
-		    slave.pendingReqTimeout.exceed()):
+		    now >= slave.pendingReqDeadline):
 			# Send a Set_Prm request
-			slave.slaveDesc.setPrmTelegram.sa = self.masterAddr
+			slaveDesc.setPrmTelegram.sa = self.masterAddr
 			ok = self.__send(slave,
-					 telegram=slave.slaveDesc.setPrmTelegram,
+					 telegram=slaveDesc.setPrmTelegram,
 					 timeout=0.05)
 			if not ok:
 				self.__debugMsg("Set_Prm failed")
 				return None
 		return None
 
-	def __runSlave_waitCfg(self, slave):
+	def __runSlave_waitCfg(self, slave, now):
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		if slave.stateJustEntered():
-			self.__debugMsg("Sending Chk_Cfg to slave %d..." %\
-				slave.slaveDesc.slaveAddr)
+			self.__debugMsg("Sending Chk_Cfg to slave %d...",
+				slaveAddr)
 			slave.flushRxQueue()
 		else:
 			if slave.shortAckReceived:
@@ -540,60 +578,62 @@ class DpMaster(object):
 				slave.setState(slave.STATE_WDXRDY)
 
 		if (not slave.pendingReq or
-		    slave.pendingReqTimeout.exceed()):
-			slave.slaveDesc.chkCfgTelegram.sa = self.masterAddr
+		    now >= slave.pendingReqDeadline):
+			slaveDesc.chkCfgTelegram.sa = self.masterAddr
 			ok = self.__send(slave,
-					 telegram=slave.slaveDesc.chkCfgTelegram,
+					 telegram=slaveDesc.chkCfgTelegram,
 					 timeout=0.05)
 			if not ok:
 				self.__debugMsg("Chk_Cfg failed")
 				return None
 		return None
 
-	def __runSlave_waitDxRdy(self, slave):
+	def __runSlave_waitDxRdy(self, slave, now):
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		if slave.stateJustEntered():
-			self.__debugMsg("Requesting Slave_Diag (WDXRDY) from slave %d..." %\
-				slave.slaveDesc.slaveAddr)
+			self.__debugMsg("Requesting Slave_Diag (WDXRDY) from slave %d...",
+				slaveAddr)
 			slave.flushRxQueue()
 		else:
 			for telegram in slave.getRxQueue():
 				if DpTelegram_SlaveDiag_Con.checkType(telegram):
 					if telegram.notExist():
 						self.__errorMsg("Slave %d is not reachable "
-							"via this line." %\
-							slave.slaveDesc.slaveAddr)
+							"via this line.",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.cfgFault():
 						self.__errorMsg("Slave %d reports a faulty "
-							"configuration (Chk_Cfg)." %\
-							slave.slaveDesc.slaveAddr)
+							"configuration (Chk_Cfg).",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.prmFault():
 						self.__errorMsg("Slave %d reports a faulty "
-							"parameterization (Set_Prm)." %\
-							slave.slaveDesc.slaveAddr)
+							"parameterization (Set_Prm).",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.prmReq():
 						self.__debugMsg("Slave %d requests a new "
-							"parameterization (Set_Prm)." %\
-							slave.slaveDesc.slaveAddr)
+							"parameterization (Set_Prm).",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.isNotSupp():
 						self.__errorMsg("Slave %d replied with "
 							"\"function not supported\". "
 							"The parameters should be checked "
-							"(Set_Prm)." %\
-							slave.slaveDesc.slaveAddr)
+							"(Set_Prm).",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.masterLock():
 						self.__errorMsg("Slave %d is already controlled "
-							"(locked to) another DP-master." %\
-							slave.slaveDesc.slaveAddr)
+							"(locked to) another DP-master.",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if not telegram.hasOnebit():
 						self.__debugMsg("Slave %d diagnostic "
-							"always-one-bit is zero." %\
-							slave.slaveDesc.slaveAddr)
+							"always-one-bit is zero.",
+							slaveAddr)
 						slave.faultDeb.fault()
 					if telegram.hasExtDiag():
 						pass#TODO turn on red DIAG-LED
@@ -608,43 +648,46 @@ class DpMaster(object):
 					break
 				else:
 					self.__debugMsg("Received spurious "
-						"telegram:\n%s" % str(telegram))
+						"telegram:\n%s", telegram)
 					slave.faultDeb.fault()
 		if (not slave.pendingReq or
-		    slave.pendingReqTimeout.exceed()):
+		    now >= slave.pendingReqDeadline):
 			ok = self.__send(slave,
-					 telegram=DpTelegram_SlaveDiag_Req(
-						da=slave.slaveDesc.slaveAddr,
-						sa=self.masterAddr),
+					 telegram=slaveDesc.slaveDiagReqTelegram,
 					 timeout=0.05)
 			if not ok:
 				self.__debugMsg("SlaveDiag_Req failed")
 				slave.faultDeb.fault()
 				return None
-		self.__checkFaultDeb(slave, False)
+		self.__checkFaultDeb(slave, now, False)
 		return None
 
-	def __runSlave_dataExchange(self, slave):
+	def __runSlave_dataExchange(self, slave, now):
+#@cy		cdef int slaveOutputSize
+#@cy		cdef int diagPeriod
+#@cy		cdef int resFunc
+		slaveDesc = slave.slaveDesc
+		slaveAddr = slaveDesc.slaveAddr
 		dataExInData = None
 
 		if slave.stateJustEntered():
-			self.__debugMsg("%sRunning Data_Exchange with slave %d..." % (
+			self.__debugMsg("%sRunning Data_Exchange with slave %d...",
 				"" if slave.dxCycleRunning else "Initialization finished. ",
-				slave.slaveDesc.slaveAddr))
+				slaveAddr)
 			slave.flushRxQueue()
 			slave.faultDeb.ok()
-			slave.dxStartTime = monotonic_time()
+			slave.dxStartTime = now
 			slave.dxCycleRunning = True
 			slave.dxCount = 0
 
-		slaveOutputSize = slave.slaveDesc.outputSize
+		slaveOutputSize = slaveDesc.outputSize
 		if slave.pendingReq:
 			for telegram in slave.getRxQueue():
 				if slaveOutputSize == 0:
 					# This slave should not send any data.
 					self.__debugMsg("Ignoring telegram in "
-						"DataExchange with slave %d:\n%s" %(
-						slave.slaveDesc.slaveAddr, str(telegram)))
+						"DataExchange with slave %d:\n%s",
+						slaveAddr, telegram)
 					slave.faultDeb.fault()
 					continue
 				else:
@@ -652,35 +695,35 @@ class DpMaster(object):
 					# Get it.
 					if not DpTelegram_DataExchange_Con.checkType(telegram):
 						self.__debugMsg("Ignoring telegram in "
-							"DataExchange with slave %d:\n%s" %(
-							slave.slaveDesc.slaveAddr, str(telegram)))
+							"DataExchange with slave %d:\n%s",
+							slaveAddr, telegram)
 						slave.faultDeb.fault()
 						continue
 					resFunc = telegram.fc & FdlTelegram.FC_RESFUNC_MASK
 					if resFunc in (FdlTelegram.FC_DH, FdlTelegram.FC_RDH):
-						self.__debugMsg("Slave %d requested diagnostics." %\
-							slave.slaveDesc.slaveAddr)
+						self.__debugMsg("Slave %d requested diagnostics.",
+							slaveAddr)
 						slave.setState(slave.STATE_WDXRDY, 0.2)
 					elif resFunc == FdlTelegram.FC_RS:
 						raise DpError("Service not active "
-							"on slave %d" % slave.slaveDesc.slaveAddr)
+							"on slave %d" % slaveAddr)
 					dataExInData = telegram.getDU()
 			if (dataExInData is not None or
 			    (slaveOutputSize == 0 and slave.shortAckReceived)):
 				# We received some data or an ACK (input-only slave).
 				slave.pendingReq = None
 				slave.faultDeb.ok()
-				slave.restartStateTimeout()
+				slave.restartStateTimeout(now=now)
 				self._releaseSlave(slave)
 			else:
 				# No data or ACK received from slave.
-				if slave.pendingReqTimeout.exceed():
-					self.__debugMsg("Data_Exchange timeout with slave %d" % (
-							slave.slaveDesc.slaveAddr))
+				if now >= slave.pendingReqDeadline:
+					self.__debugMsg("Data_Exchange timeout with slave %d",
+							slaveAddr)
 					slave.faultDeb.fault()
 					slave.pendingReq = None
 		else:
-			diagPeriod = slave.slaveDesc.diagPeriod
+			diagPeriod = slaveDesc.diagPeriod
 			if diagPeriod > 0 and slave.dxCount >= diagPeriod:
 				# The input-only slave shall periodically be diagnosed.
 				# Go to diagnostic state.
@@ -689,15 +732,14 @@ class DpMaster(object):
 				# Send the out data telegram, if any.
 				toSlaveData = slave.toSlaveData
 				if toSlaveData is not None:
-					if slave.slaveDesc.inputSize == 0:
+					if slaveDesc.inputSize == 0:
 						self.__debugMsg("Got data for slave, "
 								"but slave does not expect any input data.")
 					else:
+						telegram = slaveDesc.dataExReqTelegram
+						telegram.du = toSlaveData
 						ok = self.__send(slave,
-								 telegram=DpTelegram_DataExchange_Req(
-									da=slave.slaveDesc.slaveAddr,
-									sa=self.masterAddr,
-									du=toSlaveData),
+								 telegram=telegram,
 								 timeout=0.1)
 						if ok:
 							# We sent it. Reset the data.
@@ -706,11 +748,11 @@ class DpMaster(object):
 						else:
 							self.__debugMsg("DataExchange_Req failed")
 							slave.faultDeb.fault()
-		if self.__checkFaultDeb(slave, True):
+		if self.__checkFaultDeb(slave, now, True):
 			return None
 		return dataExInData
 
-	def __checkFaultDeb(self, slave, inDataExchange):
+	def __checkFaultDeb(self, slave, now, inDataExchange):
 		faultCount = slave.faultDeb.get()
 		if faultCount >= 5:
 			# communication lost
@@ -719,7 +761,7 @@ class DpMaster(object):
 			return True
 		elif (faultCount >= 3 and
 		      inDataExchange and
-		      (monotonic_time() >= slave.dxStartTime + 0.2 or slave.slaveDesc.outputSize == 0)):
+		      (now >= slave.dxStartTime + 0.2 or slave.slaveDesc.outputSize == 0)):
 			# Diagnose the slave
 			self.__debugMsg("Many errors in Data_Exchange. "
 					"Requesting diagnostic information...")
@@ -738,24 +780,17 @@ class DpMaster(object):
 
 	def __runSlave(self, slave):
 		self.__pollRx()
-		if not self.__haveToken:
-			return None
 
-		if slave.stateHasTimeout():
+		now = monotonic_time()
+		if slave.stateHasTimeout(now):
 			self.__debugMsg("State machine timeout! "
-				"Trying to re-initializing slave %d..." %\
+				"Trying to re-initializing slave %d...",
 				slave.slaveDesc.slaveAddr)
 			slave.setState(slave.STATE_INIT)
 			dataExInData = None
 		else:
 			handler = self.__slaveStateHandlers[slave.getState()]
-			dataExInData = handler(self, slave)
-
-			if slave.stateIsChanging():
-				self.__debugMsg("slave[%02X].state --> '%s'" % (
-					slave.slaveDesc.slaveAddr,
-					slave.state2name[slave.getNextState()]))
-		slave.applyState()
+			dataExInData = handler(self, slave, now)
 
 		return dataExInData
 
@@ -763,10 +798,12 @@ class DpMaster(object):
 		try:
 			ok, telegram = self.dpTrans.poll()
 		except ProfibusError as e:
-			self.__debugMsg("RX error: %s" % str(e))
+			self.__debugMsg("RX error: %s", e)
 			return
 		if ok and telegram:
 			if FdlTelegram_token.checkType(telegram):
+				# Token passing is not implemented.
+				# This master always behaves as if it had the token.
 				pass#TODO handle token
 			elif FdlTelegram_ack.checkType(telegram):
 				for addr, slave in self.__slaveStates.items():
@@ -781,31 +818,33 @@ class DpMaster(object):
 					slave.fcb.handleReply()
 				else:
 					self.__debugMsg("Received telegram from "
-						"unknown station %d:\n%s" %(
-						telegram.sa, str(telegram)))
+						"unknown station %d:\n%s",
+						telegram.sa, telegram)
 			else:
 				self.__debugMsg("Received telegram for "
-					"foreign station:\n%s" % str(telegram))
+					"foreign station:\n%s", telegram)
 		else:
 			if telegram:
 				self.__debugMsg("Received corrupt "
-					"telegram:\n%s" % str(telegram))
+					"telegram:\n%s", telegram)
 
 	def __handleMcastTelegram(self, telegram):
-		self.__debugMsg("Received multicast telegram:\n%s" % str(telegram))
+		self.__debugMsg("Received multicast telegram:\n%s", telegram)
 		pass#TODO
 
 	def run(self):
 		"""Run the DP-Master state machine.
 		"""
+#@cy		cdef int runNextSlaveIndex
+
 		if self.debug:
 			self.__runCount += 1
 			now = monotonic_time()
 			if now >= self.__runTimer + 10.0:
 				cps = self.__runCount / (now - self.__runTimer)
 				self.__debugMsg("State machine calls: "
-						"%.1f /s = %.3f s/call" % (
-						cps, 1.0 / cps))
+						"%.1f /s = %.3f s/call",
+						cps, 1.0 / cps)
 				self.__runTimer = now
 				self.__runCount = 0
 
@@ -830,10 +869,10 @@ class DpMaster(object):
 		if (fromSlaveData is not None and
 		    len(fromSlaveData) != slaveDesc.outputSize):
 			self.__errorMsg("Slave %d: The received data size (%d bytes) "
-					"does not match the slave's configured output_size (%d bytes)." % (
+					"does not match the slave's configured output_size (%d bytes).",
 					slaveDesc.slaveAddr,
 					len(fromSlaveData),
-					slaveDesc.outputSize))
+					slaveDesc.outputSize)
 			slave.faultDeb.fault()
 			fromSlaveData = None
 		slave.fromSlaveData = fromSlaveData
@@ -844,14 +883,19 @@ class DpMaster(object):
 		"""Set the master-out-data that will be sent the
 		next time we are able to send something to that slave.
 		"""
-		if (data is not None and
-		    len(data) != slaveDesc.inputSize):
-			raise DpError("Slave %d: The setMasterOutData() data size (%d bytes) "
-				      "does not match the slave's configured input_size (%d bytes)." % (
-				      slaveDesc.slaveAddr,
-				      len(data),
-				      slaveDesc.inputSize))
 		slave = self.__slaveStates[slaveDesc.slaveAddr]
+		if data is slave.toSlaveData:
+			# This data is already waiting to be sent.
+			return
+		if data is not None:
+			if not isinstance(data, (bytes, bytearray)):
+				data = bytearray(data)
+			if len(data) != slaveDesc.inputSize:
+				raise DpError("Slave %d: The setMasterOutData() data size (%d bytes) "
+					      "does not match the slave's configured input_size (%d bytes)." % (
+					      slaveDesc.slaveAddr,
+					      len(data),
+					      slaveDesc.inputSize))
 		slave.toSlaveData = data
 
 	def _getFromSlaveData(self, slaveDesc):
@@ -873,13 +917,24 @@ class DpMaster(object):
 		return slave.dxCycleRunning
 
 	def initialize(self):
-		"""Initialize the DPM."""
+		"""Initialize the DPM.
+		All slaves should be added before calling this.
+		Note: On CPython >= 3.7 this calls gc.freeze(), which moves
+		the whole heap into the permanent generation, including the
+		application's own objects. So don't allocate large short lived
+		data before or during initialize().
+		Call gc.unfreeze() to undo this.
+		"""
 
 		# Initialize the RX filter
 		self.fdlTrans.setRXFilter([self.masterAddr,
 					   FdlTelegram.ADDRESS_MCAST])
 		# Free memory
 		gc.collect()
+		# Move the long lived master and slave objects out of
+		# the garbage collector's way, if supported (CPython >= 3.7).
+		if hasattr(gc, "freeze"):
+			gc.freeze()
 
 	def __syncFreezeHelper(self, groupMask, controlCommand):
 		slave = self.__slaveStates[FdlTelegram.ADDRESS_MCAST]
@@ -34,7 +34,7 @@ class FdlError(ProfibusError):
 	__slots__ = (
 	)
 
-class FdlFCB():
+class FdlFCB(object):
 	"""FCB context, per slave.
 	"""
 
@@ -71,6 +71,11 @@ class FdlFCB():
 	def bitIsValid(self):
 		return self.__fcv != 0
 
+	def fcBits(self):
+		"""Get the FCB (0x20) and FCV (0x10) bits for the FC field.
+		"""
+		return (self.__fcb << 5) | (self.__fcv << 4)
+
 	def setWaitingReply(self):
 		self.__fcbWaitingReply = True
 
@@ -98,14 +103,21 @@ class FdlTransceiver(object):
 	def setRXFilter(self, newFilter):
 		if newFilter is None:
 			newFilter = range(0, FdlTelegram.ADDRESS_MASK + 1)
-		self.__rxFilter = set(newFilter)
+		# The filter is a table indexed by the address.
+		# Non-zero means the address is accepted.
+		rxFilter = bytearray(FdlTelegram.ADDRESS_MASK + 1)
+		for addr in newFilter:
+			if 0 <= addr <= FdlTelegram.ADDRESS_MASK:
+				rxFilter[addr] = 1
+		self.__rxFilter = rxFilter
 
 	def __checkRXFilter(self, telegram):
-		if telegram.da is None:
+		da = telegram.da
+		if da is None:
 			# Accept telegrams without DA field.
 			return True
 		# Accept the packet, if it's in the RX filter.
-		return (telegram.da & FdlTelegram.ADDRESS_MASK) in self.__rxFilter
+		return self.__rxFilter[da & FdlTelegram.ADDRESS_MASK] != 0
 
 	def poll(self, timeout=0.0):
 		ok, telegram = False, None
@@ -119,26 +131,18 @@ class FdlTransceiver(object):
 	# Send an FdlTelegram.
 	def send(self, fcb, telegram):
 		srd = False
-		if telegram.fc & FdlTelegram.FC_REQ:
-			func = telegram.fc & FdlTelegram.FC_REQFUNC_MASK
-			srd = func in (FdlTelegram.FC_SRD_LO,
-				       FdlTelegram.FC_SRD_HI,
-				       FdlTelegram.FC_SDA_LO,
-				       FdlTelegram.FC_SDA_HI,
-				       FdlTelegram.FC_DDB,
-				       FdlTelegram.FC_FDL_STAT,
-				       FdlTelegram.FC_IDENT,
-				       FdlTelegram.FC_LSAP)
-			telegram.fc &= ~(FdlTelegram.FC_FCB | FdlTelegram.FC_FCV)
+		fc = telegram.fc
+		if fc & FdlTelegram.FC_REQ:
+			func = fc & FdlTelegram.FC_REQFUNC_MASK
+			srd = ((FdlTelegram._FC_SRD_FUNC_BITS >> func) & 1) != 0
+			fc &= ~(FdlTelegram.FC_FCB | FdlTelegram.FC_FCV)
 			if fcb.enabled():
-				if fcb.bitIsOn():
-					telegram.fc |= FdlTelegram.FC_FCB
-				if fcb.bitIsValid():
-					telegram.fc |= FdlTelegram.FC_FCV
+				fc |= fcb.fcBits()
 				if srd:
 					fcb.setWaitingReply()
 				else:
 					fcb.FCBnext()
+			telegram.fc = fc
 		self.phy.send(telegram, srd)
 
 class FdlTelegram(object):
@@ -182,6 +186,17 @@ class FdlTelegram(object):
 	FC_IDENT	= 0x0E	# Req. ident
 	FC_LSAP		= 0x0F	# Req. LSAP status
 
+	# Bitmask of the request function codes that expect a reply.
+	# Bit n is set, if function code n expects a reply.
+	_FC_SRD_FUNC_BITS = ((1 << FC_SRD_LO) |
+			     (1 << FC_SRD_HI) |
+			     (1 << FC_SDA_LO) |
+			     (1 << FC_SDA_HI) |
+			     (1 << FC_DDB) |
+			     (1 << FC_FDL_STAT) |
+			     (1 << FC_IDENT) |
+			     (1 << FC_LSAP))
+
 	# Frame Control Frame Count Bit (FC_REQ set)
 	FC_FCV		= 0x10	# Frame Count Bit valid
 	FC_FCB		= 0x20	# Frame Count Bit
@@ -232,8 +247,9 @@ class FdlTelegram(object):
 		if dataLen < 1:
 			return -1 # Telegram too short.
 		sd = data[0]
-		if sd in cls.delim2size:
-			return cls.delim2size[sd]
+		size = _delim2sizeTab[sd]
+		if size:
+			return size
 		if sd == cls.SD2:
 			if dataLen < 3:
 				return -1 # Telegram too short.
@@ -247,11 +263,16 @@ class FdlTelegram(object):
 
 	def __init__(self, sd, haveLE=False, da=None, sa=None,
 		     fc=None, dae=b"", sae=b"", du=None,
-		     haveFCS=False, ed=None):
+		     haveFCS=False, ed=None, _unchecked=False):
 		self.sd = sd
 		self.haveLE = haveLE
-		self.da = (da & FdlTelegram.ADDRESS_MASK) if da is not None else None
-		self.sa = (sa & FdlTelegram.ADDRESS_MASK) if sa is not None else None
+		if _unchecked:
+			# The caller already masked the addresses.
+			self.da = da
+			self.sa = sa
+		else:
+			self.da = (da & FdlTelegram.ADDRESS_MASK) if da is not None else None
+			self.sa = (sa & FdlTelegram.ADDRESS_MASK) if sa is not None else None
 		self.fc = fc
 		self.dae = dae
 		self.sae = sae
@@ -262,20 +283,10 @@ class FdlTelegram(object):
 			assert(self.du is not None)
 
 	def __repr__(self):
-		def sdVal(val):
-			try:
-				return {
-					FdlTelegram.SD1	: "SD1",
-					FdlTelegram.SD2	: "SD2",
-					FdlTelegram.SD3	: "SD3",
-					FdlTelegram.SD4	: "SD4",
-					FdlTelegram.SC	: "SC",
-				}[val]
-			except KeyError:
-				return intToHex(val)
+		sdName = _sd2name.get(self.sd)
 		return ("FdlTelegram(sd=%s, haveLE=%s, da=%s, sa=%s, "
 			"fc=%s, dae=%s, sae=%s, du=%s, haveFCS=%s, ed=%s)" % (
-			sdVal(self.sd),
+			sdName if sdName else intToHex(self.sd),
 			boolToStr(self.haveLE),
 			intToHex(self.da),
 			intToHex(self.sa),
@@ -292,122 +303,173 @@ class FdlTelegram(object):
 
 	@staticmethod
 	def calcFCS(data):
+#@cy		cdef const unsigned char[:] buf
+#@cy		cdef unsigned int fcs = 0
+#@cy		cdef Py_ssize_t i
+#@cy		if isinstance(data, (bytes, bytearray)):
+#@cy			buf = data
+#@cy			for i in range(buf.shape[0]):
+#@cy				fcs += buf[i]
+#@cy			return fcs & 0xFF
 		return sum(data) & 0xFF
 
 	def getRawData(self):
-		data = bytearray()
+		da, sa, fc = self.da, self.sa, self.fc
+		dae, sae, du = self.dae, self.sae, self.du
+		assert isinstance(dae, (bytes, bytearray))
+		assert isinstance(sae, (bytes, bytearray))
+		assert du is None or isinstance(du, (bytes, bytearray))
+		sd = self.sd
 		if self.haveLE:
-			le = 3 + self.getRealDuLen()
-			data.append(self.sd)
-			data.append(le)
-			data.append(le)
-		data.append(self.sd)
-		if self.da is not None:
-			data.append((self.da | FdlTelegram.ADDRESS_EXT) if self.dae
-				    else self.da)
-		if self.sa is not None:
-			data.append((self.sa | FdlTelegram.ADDRESS_EXT) if self.sae
-				    else self.sa)
-		if self.fc is not None:
-			data.append(self.fc)
-		assert isinstance(self.dae, (bytes, bytearray))
-		data.extend(self.dae)
-		assert isinstance(self.sae, (bytes, bytearray))
-		data.extend(self.sae)
-		if self.du is not None:
-			assert isinstance(self.du, (bytes, bytearray))
-			data.extend(self.du)
+			le = 3 + len(dae) + len(sae) + len(du)
+			data = bytearray((sd, le, le, sd))
+		else:
+			data = bytearray((sd,))
+		# The FCS is summed up while the fields are added.
+		# That avoids slicing the raw data for the FCS calculation.
+		fcs = 0
+		if da is not None:
+			if dae:
+				da |= FdlTelegram.ADDRESS_EXT
+			data.append(da)
+			fcs += da
+		if sa is not None:
+			if sae:
+				sa |= FdlTelegram.ADDRESS_EXT
+			data.append(sa)
+			fcs += sa
+		if fc is not None:
+			data.append(fc)
+			fcs += fc
+		if dae:
+			data.extend(dae)
+			fcs += FdlTelegram.calcFCS(dae)
+		if sae:
+			data.extend(sae)
+			fcs += FdlTelegram.calcFCS(sae)
+		if du:
+			data.extend(du)
+			fcs += FdlTelegram.calcFCS(du)
 		if self.haveFCS:
-			if self.haveLE:
-				fcs = self.calcFCS(data[4:])
-			else:
-				fcs = self.calcFCS(data[1:])
-			data.append(fcs)
-		if self.ed is not None:
-			data.append(self.ed)
+			data.append(fcs & 0xFF)
+		ed = self.ed
+		if ed is not None:
+			data.append(ed)
 		return data
 
 	# Extract address extension bytes from DU
 	@staticmethod
 	def __duExtractAe(du):
-		ae = bytearray()
-		while 1:
-			if not du:
-				raise FdlError("Address extension error: Data too short")
-			aeByte = du[0]
-			ae.append(aeByte)
-			du = du[1:]
-			if not aeByte & FdlTelegram.AE_EXT:
-				break
-		return (du, ae)
+		# Scan for the last address extension byte
+		# and split the DU only once.
+		AE_EXT = FdlTelegram.AE_EXT
+		duLen = len(du)
+		i = 0
+		while i < duLen and du[i] & AE_EXT:
+			i += 1
+		if i >= duLen:
+			raise FdlError("Address extension error: Data too short")
+		i += 1
+		ae = du[:i]
+		if not isinstance(ae, bytearray):
+			ae = bytearray(ae)
+		return (du[i:], ae)
+
+	@staticmethod
+	def _fromRawSD1(data):
+		# No DU
+		if len(data) != 6:
+			raise FdlError("Invalid FDL packet length")
+		if data[5] != FdlTelegram.ED:
+			raise FdlError("Invalid end delimiter")
+		if data[4] != (data[1] + data[2] + data[3]) & 0xFF:
+			raise FdlError("Checksum mismatch")
+		ADDRESS_MASK = FdlTelegram.ADDRESS_MASK
+		return FdlTelegram_stat0(
+			da=data[1] & ADDRESS_MASK,
+			sa=data[2] & ADDRESS_MASK,
+			fc=data[3], _unchecked=True)
+
+	@staticmethod
+	def _fromRawSD2(data):
+		# Variable DU
+		sd, le = data[0], data[1]
+		if data[2] != le or data[3] != sd or\
+		   le < 3 or le > 249 or\
+		   len(data) != le + 6 or data[5+le] != FdlTelegram.ED:
+			# Slow path: Find the error.
+			if data[2] != le:
+				raise FdlError("Repeated length field mismatch")
+			if le < 3 or le > 249:
+				raise FdlError("Invalid LE field")
+			if data[3] != sd:
+				raise FdlError("Repeated SD mismatch")
+			if len(data) != le + 6:
+				raise FdlError("Invalid FDL packet length")
+			raise FdlError("Invalid end delimiter")
+		du = data[7:le+4]
+		da, sa, fc, dae, sae = data[4], data[5], data[6], b"", b""
+		if data[4+le] != (da + sa + fc + FdlTelegram.calcFCS(du)) & 0xFF:
+			raise FdlError("Checksum mismatch")
+		ADDRESS_EXT = FdlTelegram.ADDRESS_EXT
+		if da & ADDRESS_EXT:
+			du, dae = FdlTelegram.__duExtractAe(du)
+		if sa & ADDRESS_EXT:
+			du, sae = FdlTelegram.__duExtractAe(du)
+		ADDRESS_MASK = FdlTelegram.ADDRESS_MASK
+		return FdlTelegram_var(
+			da=da & ADDRESS_MASK, sa=sa & ADDRESS_MASK,
+			fc=fc, dae=dae, sae=sae, du=du,
+			_unchecked=True)
+
+	@staticmethod
+	def _fromRawSD3(data):
+		# Static 8 byte DU
+		if len(data) != 14:
+			raise FdlError("Invalid FDL packet length")
+		if data[13] != FdlTelegram.ED:
+			raise FdlError("Invalid end delimiter")
+		du = data[4:12]
+		da, sa, fc, dae, sae = data[1], data[2], data[3], b"", b""
+		if data[12] != (da + sa + fc + FdlTelegram.calcFCS(du)) & 0xFF:
+			raise FdlError("Checksum mismatch")
+		ADDRESS_EXT = FdlTelegram.ADDRESS_EXT
+		if da & ADDRESS_EXT:
+			du, dae = FdlTelegram.__duExtractAe(du)
+		if sa & ADDRESS_EXT:
+			du, sae = FdlTelegram.__duExtractAe(du)
+		ADDRESS_MASK = FdlTelegram.ADDRESS_MASK
+		return FdlTelegram_stat8(
+			da=da & ADDRESS_MASK, sa=sa & ADDRESS_MASK,
+			fc=fc, dae=dae, sae=sae, du=du,
+			_unchecked=True)
+
+	@staticmethod
+	def _fromRawSD4(data):
+		# Token telegram
+		if len(data) != 3:
+			raise FdlError("Invalid FDL packet length")
+		ADDRESS_MASK = FdlTelegram.ADDRESS_MASK
+		return FdlTelegram_token(
+			da=data[1] & ADDRESS_MASK,
+			sa=data[2] & ADDRESS_MASK,
+			_unchecked=True)
+
+	@staticmethod
+	def _fromRawSC(data):
+		# ACK
+		if len(data) != 1:
+			raise FdlError("Invalid FDL packet length")
+		return FdlTelegram_ack()
 
 	@staticmethod
 	def fromRawData(data):
 		error = False
 		try:
-			sd = data[0]
-			if sd == FdlTelegram.SD1:
-				# No DU
-				if len(data) != 6:
-					raise FdlError("Invalid FDL packet length")
-				if data[5] != FdlTelegram.ED:
-					raise FdlError("Invalid end delimiter")
-				if data[4] != FdlTelegram.calcFCS(data[1:4]):
-					raise FdlError("Checksum mismatch")
-				return FdlTelegram_stat0(
-					da=data[1], sa=data[2], fc=data[3])
-			elif sd == FdlTelegram.SD2:
-				# Variable DU
-				le = data[1]
-				if data[2] != le:
-					raise FdlError("Repeated length field mismatch")
-				if le < 3 or le > 249:
-					raise FdlError("Invalid LE field")
-				if data[3] != sd:
-					raise FdlError("Repeated SD mismatch")
-				if data[5+le] != FdlTelegram.ED:
-					raise FdlError("Invalid end delimiter")
-				if data[4+le] != FdlTelegram.calcFCS(data[4:4+le]):
-					raise FdlError("Checksum mismatch")
-				du = data[7:7+(le-3)]
-				if len(du) != le - 3:
-					raise FdlError("FDL packet shorter than FE")
-				da, sa, dae, sae = data[4], data[5], b"", b""
-				if da & FdlTelegram.ADDRESS_EXT:
-					du, dae = FdlTelegram.__duExtractAe(du)
-				if sa & FdlTelegram.ADDRESS_EXT:
-					du, sae = FdlTelegram.__duExtractAe(du)
-				return FdlTelegram_var(
-					da=da, sa=sa, fc=data[6], dae=dae, sae=sae, du=du)
-			elif sd == FdlTelegram.SD3:
-				# Static 8 byte DU
-				if len(data) != 14:
-					raise FdlError("Invalid FDL packet length")
-				if data[13] != FdlTelegram.ED:
-					raise FdlError("Invalid end delimiter")
-				if data[12] != FdlTelegram.calcFCS(data[1:12]):
-					raise FdlError("Checksum mismatch")
-				du = data[4:12]
-				da, sa, dae, sae = data[1], data[2], b"", b""
-				if da & FdlTelegram.ADDRESS_EXT:
-					du, dae = FdlTelegram.__duExtractAe(du)
-				if sa & FdlTelegram.ADDRESS_EXT:
-					du, sae = FdlTelegram.__duExtractAe(du)
-				return FdlTelegram_stat8(
-					da=da, sa=sa, fc=data[3], dae=dae, sae=sae, du=du)
-			elif sd == FdlTelegram.SD4:
-				# Token telegram
-				if len(data) != 3:
-					raise FdlError("Invalid FDL packet length")
-				return FdlTelegram_token(
-					da=data[1], sa=data[2])
-			elif sd == FdlTelegram.SC:
-				# ACK
-				if len(data) != 1:
-					raise FdlError("Invalid FDL packet length")
-				return FdlTelegram_ack()
-			else:
+			fromRaw = _sd2fromRaw.get(data[0])
+			if fromRaw is None:
 				raise FdlError("Invalid start delimiter")
+			return fromRaw(data)
 		except IndexError:
 			error = True
 		if error:
@@ -417,15 +479,41 @@ class FdlTelegram(object):
 	def checkType(cls, telegram):
 		return isinstance(telegram, cls)
 
+# Delimiter to size lookup table, indexed by the SD byte.
+# 0 = Variable size (SD2) or unknown start delimiter.
+_delim2sizeTab = bytearray(256)
+for _sd, _size in FdlTelegram.delim2size.items():
+	_delim2sizeTab[_sd] = _size
+del _sd, _size
+
+# Start delimiter names for __repr__.
+_sd2name = {
+	FdlTelegram.SD1	: "SD1",
+	FdlTelegram.SD2	: "SD2",
+	FdlTelegram.SD3	: "SD3",
+	FdlTelegram.SD4	: "SD4",
+	FdlTelegram.SC	: "SC",
+}
+
+# Start delimiter to raw data parser.
+_sd2fromRaw = {
+	FdlTelegram.SD1	: FdlTelegram._fromRawSD1,
+	FdlTelegram.SD2	: FdlTelegram._fromRawSD2,
+	FdlTelegram.SD3	: FdlTelegram._fromRawSD3,
+	FdlTelegram.SD4	: FdlTelegram._fromRawSD4,
+	FdlTelegram.SC	: FdlTelegram._fromRawSC,
+}
+
 class FdlTelegram_var(FdlTelegram):
 	__slots__ = (
 	)
 
-	def __init__(self, da, sa, fc, dae, sae, du):
+	def __init__(self, da, sa, fc, dae, sae, du, _unchecked=False):
 		FdlTelegram.__init__(self, sd=FdlTelegram.SD2,
 			haveLE=True, da=da, sa=sa, fc=fc,
 			dae=dae, sae=sae, du=du,
-			haveFCS=True, ed=FdlTelegram.ED)
+			haveFCS=True, ed=FdlTelegram.ED,
+			_unchecked=_unchecked)
 		if self.getRealDuLen() > 246:
 			raise FdlError("Invalid data length (> 246)")
 
@@ -433,11 +521,12 @@ class FdlTelegram_stat8(FdlTelegram):
 	__slots__ = (
 	)
 
-	def __init__(self, da, sa, fc, dae, sae, du):
+	def __init__(self, da, sa, fc, dae, sae, du, _unchecked=False):
 		FdlTelegram.__init__(self, sd=FdlTelegram.SD3,
 			da=da, sa=sa, fc=fc,
 			dae=dae, sae=sae, du=du,
-			haveFCS=True, ed=FdlTelegram.ED)
+			haveFCS=True, ed=FdlTelegram.ED,
+			_unchecked=_unchecked)
 		if self.getRealDuLen() != 8:
 			raise FdlError("Invalid data length (!= 8)")
 
@@ -445,18 +534,19 @@ class FdlTelegram_stat0(FdlTelegram):
 	__slots__ = (
 	)
 
-	def __init__(self, da, sa, fc):
+	def __init__(self, da, sa, fc, _unchecked=False):
 		FdlTelegram.__init__(self, sd=FdlTelegram.SD1,
 			da=da, sa=sa, fc=fc,
-			haveFCS=True, ed=FdlTelegram.ED)
+			haveFCS=True, ed=FdlTelegram.ED,
+			_unchecked=_unchecked)
 
 class FdlTelegram_token(FdlTelegram):
 	__slots__ = (
 	)
 
-	def __init__(self, da, sa):
+	def __init__(self, da, sa, _unchecked=False):
 		FdlTelegram.__init__(self, sd=FdlTelegram.SD4,
-			da=da, sa=sa)
+			da=da, sa=sa, _unchecked=_unchecked)
 
 class FdlTelegram_ack(FdlTelegram):
 	__slots__ = (
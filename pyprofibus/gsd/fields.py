@@ -29,6 +29,9 @@ GSD_STR = (
 	"Ext_User_Prm_Data_Ref",
 )
 
+# GSD_STR string to index lookup.
+_GSD_STR_INDEX = { cs : i for i, cs in enumerate(GSD_STR) }
+
 def gsdrepr(x):
 	if isinstance(x, list):
 		return "[%s]" % ", ".join(gsdrepr(a) for a in x)
@@ -38,9 +41,9 @@ def gsdrepr(x):
 		return "{%s}" % ", ".join("%s : %s\n" % (gsdrepr(a), gsdrepr(b))
 					  for a, b in x.items())
 	if isinstance(x, str):
-		for i, cs in enumerate(GSD_STR):
-			if cs == x:
-				return "GSD_STR[%s]" % i
+		i = _GSD_STR_INDEX.get(x)
+		if i is not None:
+			return "GSD_STR[%s]" % i
 	return repr(x)
 
 class _Item(object):
@@ -48,20 +51,36 @@ class _Item(object):
 	"""
 
 	__slots__ = (
-		"fields",
+		"_fields",
 	)
 
 	def __init__(self, fields=None):
-		self.fields = fields or {}
+		# Most items never get any fields.
+		# Only allocate the dict on first use.
+		self._fields = fields or None
+
+	@property
+	def fields(self):
+		fields = self._fields
+		if fields is None:
+			fields = self._fields = {}
+		return fields
+
+	@fields.setter
+	def fields(self, fields):
+		self._fields = fields
 
 	def getField(self, name, default=None):
 		"""Get a field by name.
 		"""
-		return self.fields.get(name, default)
+		fields = self._fields
+		if fields is None:
+			return default
+		return fields.get(name, default)
 
 	def _repr_field(self, pfx=", ", sfx=""):
-		if self.fields:
-			return "%sfields=%s%s" % (pfx, gsdrepr(self.fields), sfx)
+		if self._fields:
+			return "%sfields=%s%s" % (pfx, gsdrepr(self._fields), sfx)
 		return ""
 
 class PrmText(_Item):
@@ -190,9 +209,11 @@ class Module(_Item):
 		"configBytes",
 	)
 
+	_reWhitespace = re.compile(r"\s+")
+
 	@classmethod
 	def sanitizeName(cls, name):
-		return re.subn(r"\s+", " ", name)[0].strip()
+		return cls._reWhitespace.sub(" ", name).strip()
 
 	def __init__(self, name, configBytes, **kwargs):
 		_Item.__init__(self, **kwargs)
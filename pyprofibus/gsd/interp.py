@@ -14,8 +14,6 @@ from pyprofibus.compat import *
 from pyprofibus.gsd.parser import GsdParser, GsdError
 from pyprofibus.dp import DpCfgDataElement
 
-import difflib
-
 __all__ = [
 	"GsdInterp",
 ]
@@ -24,8 +22,39 @@ class GsdInterp(GsdParser):
 	"""GSD file/data interpreter.
 	"""
 
+	# Baud rate to MaxTsdr field name.
+	_baud2fieldname = {
+		9600		: "MaxTsdr_9.6",
+		19200		: "MaxTsdr_19.2",
+		45450		: "MaxTsdr_45.45",
+		93750		: "MaxTsdr_93.75",
+		187500		: "MaxTsdr_187.5",
+		500000		: "MaxTsdr_500",
+		1500000		: "MaxTsdr_1.5M",
+		3000000		: "MaxTsdr_3M",
+		6000000		: "MaxTsdr_6M",
+		12000000	: "MaxTsdr_12M",
+	}
+
 	def __init__(self, text, filename=None, debug=False):
 		super(GsdInterp, self).__init__(text, filename, debug)
+		# The parsed fields don't change anymore.
+		# Resolve the module fields once.
+		self.__modules = tuple(self.getField("Module", []))
+		presetModules, otherModules = [], []
+		for mod in self.__modules:
+			if mod.getField("Preset", False):
+				presetModules.append(mod)
+			else:
+				otherModules.append(mod)
+		self.__presetModules = tuple(presetModules)
+		self.__otherModules = tuple(otherModules)
+		self.__fixPresetModules = self.getField("FixPresetModules", False)
+		self.__moduleIndex = None
+		self.__moduleSearchCache = {}
+		self.__globalPrmData = None
+		self.__modulePrmData = {}
+		self.__moduleCfgData = {}
 		self.__configMods = []
 		self.__addPresetModules(onlyFixed=False)
 		if not self.isModular():
@@ -44,63 +73,88 @@ class GsdInterp(GsdParser):
 			errorText))
 
 	@staticmethod
-	def __findInSequence(sequence, findName, getItemName):
+	def __findInSequence(sequence, names, namesLower, findName, nameLower):
+		"""Find an item by matching its name at the start
+		or by fuzzy matching.
+		names/namesLower: The item names and the lower case stripped names.
+		nameLower: The lower case stripped findName.
+		The unique exact matches are expected to be handled by the caller.
+		"""
 		if not sequence:
 			return None
-		nameLower = findName.lower().strip()
-
-		# Check if there's only one matching exactly.
-		matches = [ item for item in sequence
-			    if findName == getItemName(item) ]
-		if len(matches) == 1:
-			return matches[0]
-
-		# Check if there's only one matching exactly (case insensitive).
-		matches = [ item for item in sequence
-			    if nameLower == getItemName(item).lower().strip() ]
-		if len(matches) == 1:
-			return matches[0]
 
 		# Check if there's only one matching at the start.
-		matches = [ item for item in sequence
-			    if getItemName(item).lower().strip().startswith(nameLower) ]
-		if len(matches) == 1:
-			return matches[0]
+		prefix = None
+		for item, itemNameLower in zip(sequence, namesLower):
+			if itemNameLower.startswith(nameLower):
+				if prefix is not None:
+					prefix = None
+					break
+				prefix = item
+		if prefix is not None:
+			return prefix
 
 		# Fuzzy match.
-		matches = difflib.get_close_matches(
-				findName,
-				( getItemName(item) for item in sequence ),
-				n = 1)
+		import difflib
+		matches = difflib.get_close_matches(findName, names, n = 1)
 		if matches:
-			matches = [ item for item in sequence
-				    if getItemName(item) == matches[0] ]
-			if matches:
-				return matches[0]
+			for item, itemName in zip(sequence, names):
+				if itemName == matches[0]:
+					return item
 		return None
 
+	def __getModuleIndex(self):
+		"""Get the (exact, case insensitive) module name lookup dicts
+		and the (names, lower case stripped names) lists.
+		Names that are not unique map to None in the dicts.
+		"""
+		if self.__moduleIndex is None:
+			exact, nocase = {}, {}
+			names, namesLower = [], []
+			for mod in self.__modules:
+				name = mod.name
+				names.append(name)
+				exact[name] = None if name in exact else mod
+				name = name.lower().strip()
+				namesLower.append(name)
+				nocase[name] = None if name in nocase else mod
+			self.__moduleIndex = (exact, nocase, names, namesLower)
+		return self.__moduleIndex
+
 	def findModule(self, name):
 		"""Find a module by name.
 		Returns a _Module instance, if found. None otherwise.
 		"""
-		return self.__findInSequence(self.getField("Module"),
-					     name,
-					     lambda module: module.name)
+		# Try the unique exact match first.
+		exact, nocase, names, namesLower = self.__getModuleIndex()
+		mod = exact.get(name)
+		if mod is not None:
+			return mod
+		# The search cache only holds names that
+		# are not found in the lookup dicts.
+		cache = self.__moduleSearchCache
+		if name in cache:
+			return cache[name]
+		nameLower = name.lower().strip()
+		mod = nocase.get(nameLower)
+		if mod is None:
+			# Do the expensive prefix and fuzzy search
+			# only once per name.
+			mod = self.__findInSequence(self.__modules,
+						    names, namesLower,
+						    name, nameLower)
+			cache[name] = mod
+		return mod
 
 	def __addPresetModules(self, onlyFixed=False):
-		if not self.getField("FixPresetModules", False) and\
-		   onlyFixed:
+		if not self.__fixPresetModules and onlyFixed:
 			return
-		for mod in self.getField("Module", []):
-			if mod.getField("Preset", False):
-				self.__configMods.append(mod)
+		self.__configMods.extend(self.__presetModules)
 
 	def __addAllModules(self):
 		"""Configure all available modules as plugged into the device.
 		"""
-		for mod in self.getField("Module", []):
-			if not mod.getField("Preset", False):
-				self.__configMods.append(mod)
+		self.__configMods.extend(self.__otherModules)
 
 	def clearConfiguredModules(self):
 		"""Remove all configured modules.
@@ -116,7 +170,7 @@ class GsdInterp(GsdParser):
 		If moduleName is None then the module is removed.
 		"""
 		if index >= 0 and index < len(self.__configMods) and\
-		   self.getField("FixPresetModules", False) and\
+		   self.__fixPresetModules and\
 		   self.__configMods[index].getField("Preset", False):
 			self.__interpErr("Not modifying fixed preset module "
 				"at index %d." % index)
@@ -146,48 +200,77 @@ class GsdInterp(GsdParser):
 		"""
 		return self.getField("DPV1_Slave", False)
 
+	def __getModuleCfgData(self, mod):
+		"""Get the (identifier, lengthBytes) config data of one module.
+		This only depends on the parsed fields, so it is split once.
+		"""
+		cfgData = self.__moduleCfgData.get(mod)
+		if cfgData is None:
+			configBytes = mod.configBytes
+			cfgData = self.__moduleCfgData[mod] = (configBytes[0],
+								configBytes[1:])
+		return cfgData
+
 	def getCfgDataElements(self):
 		"""Get a tuple of config data elements (DpCfgDataElement)
 		for this station with the configured modules.
 		"""
-		elems = []
-		for mod in self.__configMods:
-			elems.append(DpCfgDataElement(
-				mod.configBytes[0],
-				mod.configBytes[1:]))
-		return elems
+		return tuple(DpCfgDataElement(*self.__getModuleCfgData(mod))
+			     for mod in self.__configMods)
+
+	@staticmethod
+	def __prmMerge(baseData, extData, offset):
+		if extData is not None:
+			baseData[offset : len(extData) + offset] = extData
+
+	def __prmTrunc(self, data, length, fieldname, extend = True):
+		if length is not None:
+			dataLen = len(data)
+			if extend and dataLen < length:
+				data.extend(bytearray(length - dataLen))
+			elif dataLen > length:
+				self.__interpWarn("User_Prm_Data "
+					"truncated by %s" % fieldname)
+				data[:] = data[0:length]
+
+	def __getGlobalPrmData(self):
+		"""Get the global User_Prm_Data without the modules.
+		This only depends on the parsed fields, so it is built once.
+		"""
+		if self.__globalPrmData is None:
+			data = bytearray(self.getField("User_Prm_Data", b""))
+			self.__prmTrunc(data, self.getField("User_Prm_Data_Len"),
+					"User_Prm_Data_Len")
+			for dataConst in self.getField("Ext_User_Prm_Data_Const", []):
+				self.__prmMerge(data, dataConst.dataBytes, dataConst.offset)
+			self.__globalPrmData = bytes(data)
+		return self.__globalPrmData
+
+	def __getModulePrmData(self, mod):
+		"""Get the User_Prm_Data of one module.
+		This only depends on the parsed fields, so it is built once.
+		"""
+		modData = self.__modulePrmData.get(mod)
+		if modData is None:
+			modData = bytearray()
+			for dataConst in mod.getField("Ext_User_Prm_Data_Const", []):
+				self.__prmMerge(modData, dataConst.dataBytes, dataConst.offset)
+			self.__prmTrunc(modData, mod.getField("Ext_Module_Prm_Data_Len"),
+					"Ext_Module_Prm_Data_Len")
+			modData = self.__modulePrmData[mod] = bytes(modData)
+		return modData
 
 	def getUserPrmData(self, dp1PrmMask = None, dp1PrmSet = None):
 		"""Get a bytearray of User_Prm_Data
 		for this station with the configured modules.
 		dp1PrmMask/Set: Optional mask/set override for the DPV1 prm.
 		"""
-		def merge(baseData, extData, offset):
-			if extData is not None:
-				baseData[offset : len(extData) + offset] = extData
-		def trunc(data, length, fieldname, extend = True):
-			if length is not None:
-				if extend:
-					data.extend(bytearray(max(length - len(data), 0)))
-				if len(data) > length:
-					self.__interpWarn("User_Prm_Data "
-						"truncated by %s" % fieldname)
-					data[:] = data[0:length]
-		# Get the global data.
-		data = bytearray(self.getField("User_Prm_Data", b""))
-		trunc(data, self.getField("User_Prm_Data_Len"),
-		      "User_Prm_Data_Len")
-		for dataConst in self.getField("Ext_User_Prm_Data_Const", []):
-			merge(data, dataConst.dataBytes, dataConst.offset)
-		# Append the module parameter data.
-		for mod in self.__configMods:
-			modData = bytearray()
-			for dataConst in mod.getField("Ext_User_Prm_Data_Const", []):
-				merge(modData, dataConst.dataBytes, dataConst.offset)
-			trunc(modData, mod.getField("Ext_Module_Prm_Data_Len"),
-			      "Ext_Module_Prm_Data_Len")
-			# Add to global data.
-			data += modData
+		# Concatenate the global data and
+		# the module parameter data in one go.
+		parts = [ self.__getGlobalPrmData() ]
+		parts.extend(self.__getModulePrmData(mod)
+			     for mod in self.__configMods)
+		data = bytearray(b"".join(parts))
 		if self.isDPV1():
 			assert((dp1PrmMask is None and dp1PrmSet is None) or\
 			       (dp1PrmMask is not None and dp1PrmSet is not None))
@@ -196,14 +279,19 @@ class GsdInterp(GsdParser):
 				if len(data) < 3:
 					self.__interpErr("DPv1 User_Prm_Data is "
 						"shorter than 3 bytes.")
-				# Apply the DPv1 prm override.
-				for i in range(3):
-					data[i] = (data[i] & ~dp1PrmMask[i]) |\
-						  (dp1PrmSet[i] & dp1PrmMask[i])
+				# Apply the DPv1 prm override to all three bytes at once.
+				prm = (data[0] << 16) | (data[1] << 8) | data[2]
+				mask = (dp1PrmMask[0] << 16) | (dp1PrmMask[1] << 8) | dp1PrmMask[2]
+				prmSet = (dp1PrmSet[0] << 16) | (dp1PrmSet[1] << 8) | dp1PrmSet[2]
+				# The result stays within 24 bits.
+				prm = (prm & ~mask) | (prmSet & mask)
+				data[0] = prm >> 16
+				data[1] = (prm >> 8) & 0xFF
+				data[2] = prm & 0xFF
 		elif dp1PrmMask is not None:
 			self.__interpWarn("DPv1 User_Prm_Data override ignored")
-		trunc(data, self.getField("Max_User_Prm_Data_Len"),
-		      "Max_User_Prm_Data_Len", False)
+		self.__prmTrunc(data, self.getField("Max_User_Prm_Data_Len"),
+				"Max_User_Prm_Data_Len", False)
 		return bytes(data)
 
 	def getIdentNumber(self):
@@ -218,21 +306,9 @@ class GsdInterp(GsdParser):
 		"""Get the max-tSDR.
 		Might return None.
 		"""
-		baud2fieldname = {
-			9600		: "MaxTsdr_9.6",
-			19200		: "MaxTsdr_19.2",
-			45450		: "MaxTsdr_45.45",
-			93750		: "MaxTsdr_93.75",
-			187500		: "MaxTsdr_187.5",
-			500000		: "MaxTsdr_500",
-			1500000		: "MaxTsdr_1.5M",
-			3000000		: "MaxTsdr_3M",
-			6000000		: "MaxTsdr_6M",
-			12000000	: "MaxTsdr_12M",
-		}
-		if baudrate not in baud2fieldname:
+		fieldname = self._baud2fieldname.get(baudrate)
+		if fieldname is None:
 			self.__interpErr("getMaxTSDR: Invalid baud rate.")
-		fieldname = baud2fieldname[baudrate]
 		return self.getField(fieldname, None)
 
 	def __str__(self):
@@ -253,9 +329,7 @@ class GsdInterp(GsdParser):
 		if order:
 			text.append("Order number:      %s\n" % order)
 
-		for module in self.getField("Module", []):
-			if module.getField("Preset"):
-				continue
-			text.append("Available module:  \"%s\"\n" % module.name)
+		text.extend("Available module:  \"%s\"\n" % module.name
+			    for module in self.__otherModules)
 
 		return "".join(text)
@@ -11,7 +11,6 @@
 from __future__ import division, absolute_import, print_function, unicode_literals
 from pyprofibus.compat import *
 
-import gc
 import re
 
 from pyprofibus.util import ProfibusError
@@ -51,22 +50,36 @@ class GsdParser(object):
 		def readfile():
 			try:
 				with open(filepath, "rb") as fd:
-					while True:
-						line = fd.readline()
-						if not line:
-							break
+					# The file object is buffered.
+					# Iterate it instead of calling readline().
+					for line in fd:
 						yield line.decode("latin_1").rstrip("\r\n")
 			except (IOError, UnicodeError) as e:
 				raise GsdError("Failed to read GSD file '%s':\n%s" % (
 					filepath, str(e)))
 		return cls(readfile(), filepath, debug)
 
+	# Line separators that str.splitlines() knows, but bytes.splitlines() doesn't.
+	_strOnlyLineSeps = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\x85")
+
 	@classmethod
 	def fromBytes(cls, data, filename=None, debug=False):
-		try:
-			lines = data.decode("latin_1").splitlines()
-		except UnicodeError as e:
-			raise GsdError("Failed to parse GSD data: %s" % str(e))
+		def decodeLines(byteLines):
+			try:
+				for line in byteLines:
+					yield line.decode("latin_1")
+			except UnicodeError as e:
+				raise GsdError("Failed to parse GSD data: %s" % str(e))
+		if any(sep in data for sep in cls._strOnlyLineSeps):
+			# Split like the decoded text would be split.
+			try:
+				lines = data.decode("latin_1").splitlines()
+			except UnicodeError as e:
+				raise GsdError("Failed to parse GSD data: %s" % str(e))
+		else:
+			# Decode line by line. This avoids
+			# a decoded copy of the whole data.
+			lines = decodeLines(data.splitlines())
 		return cls(lines, filename, debug)
 
 	@classmethod
@@ -136,6 +149,12 @@ class GsdParser(object):
 		       "Module; "\
 		       "fields = " + gsdrepr(fields)
 
+	def duplicate(self):
+		"""Create a new instance for the same GSD data.
+		The already parsed data is used. It is not parsed again.
+		"""
+		return self.__class__(self.__fields, self.__filename, self.__debug)
+
 	def getFileName(self):
 		return self.__filename
 
@@ -146,67 +165,57 @@ class GsdParser(object):
 		self.__fields = {}
 
 	def __preprocess(self, lines):
-		lines = [ self._Line(i + 1, l)
-			  for i, l in enumerate(lines) ]
-
-		# Find the GSD section and discard the rest.
-		newLines, inGsd = [], False
-		for line in lines:
-			if inGsd:
-				if line.text.startswith("#"):
-					break
-				newLines.append(line)
-			else:
-				if line.text == "#Profibus_DP":
+		"""Generator yielding the preprocessed _Line()s.
+		"""
+#@cy		cdef Py_ssize_t i
+#@cy		cdef Py_ssize_t sc
+#@cy		cdef bint inGsd
+#@cy		cdef bint isCont
+		inGsd, cont, contParts = False, None, None
+		for i, text in enumerate(lines):
+			# Find the GSD section and discard the rest.
+			if not inGsd:
+				if text == "#Profibus_DP":
 					inGsd = True
-		lines = newLines
-		gc.collect()
-
-		# Remove comments
-		newLines = []
-		for line in lines:
-			newLineText, inQuote = [], False
-			for c in line.text:
-				if inQuote:
-					inQuote = (c == '"')
-				else:
-					if c == ";":
-						line.text = "".join(newLineText)
-						line.text = line.text.rstrip()
-						break
-					inQuote = (c == '"')
-				newLineText.append(c)
-			newLines.append(line)
-		lines = newLines
-		gc.collect()
-
-		# Expand line continuations.
-		newLines, inCont = [], False
-		for line in lines:
-			if inCont:
-				if line.text.endswith("\\"):
-					line.text = line.text[:-1]
-				else:
-					inCont = False
-				newLines[-1].text += line.text
+				continue
+			if text.startswith("#"):
+				break
+
+			# Remove comments.
+			# A semicolon starts a comment,
+			# unless it directly follows a quote.
+			sc = text.find(";")
+			while sc > 0 and text[sc - 1] == '"':
+				sc = text.find(";", sc + 1)
+			if sc >= 0:
+				text = text[:sc].rstrip()
+
+			# Expand line continuations.
+			isCont = text.endswith("\\")
+			if isCont:
+				text = text[:-1]
+			if cont is None:
+				line = self._Line(i + 1, text)
+				if isCont:
+					# Collect the parts and join them once at the end.
+					cont, contParts = line, [text]
+					continue
 			else:
-				if line.text.endswith("\\"):
-					line.text = line.text[:-1]
-					inCont = True
-				newLines.append(line)
-		lines = newLines
-		gc.collect()
-
-		# Strip all lines and remove empty lines.
-		newLines = []
-		for line in lines:
+				contParts.append(text)
+				if isCont:
+					continue
+				line = cont
+				line.text = "".join(contParts)
+				cont, contParts = None, None
+
+			# Strip the line and remove it, if it's empty.
 			line.text = line.text.strip()
 			if line.text:
-				newLines.append(line)
-		lines = newLines
-		gc.collect()
-
-		return lines
+				yield line
+		if cont is not None:
+			cont.text = "".join(contParts).strip()
+			if cont.text:
+				yield cont
 
 	_reNum = r'(?:0x[0-9a-fA-F]+)|(?:[0-9]+)'
 	_reStr = r'[ a-zA-Z0-9\._\-\+\*\/\<\>\(\)\[\]\{\}\!\$\%\&\?\^\|\=\#\;\,\:\`]+'
@@ -218,6 +227,15 @@ class GsdParser(object):
 			       r'"(' + _reStr + r')"\s+' +\
 			       r'(.+)$')
 
+	# Value parts of the simple field regexes.
+	_reValNum = r'=\s*(' + _reNum + r')$'
+	_reValStr = r'=\s*"(' + _reStr + r')"$'
+	_reValAny = r'=\s*(.*)$'
+
+	# (literal name prefix, compiled regex) of the simple fields,
+	# by (value part, name, hasOffset).
+	_reFieldCache = {}
+
 	_STATE_GLOBAL		= 0
 	_STATE_PRMTEXT		= 1
 	_STATE_EXTUSERPRMDATA	= 2
@@ -244,18 +262,48 @@ class GsdParser(object):
 			return int(numText[2:], 16)
 		return int(numText, 10)
 
+	# Byte array of two digit hex numbers only, separated by commas and spaces.
+	_reHexByteArray = re.compile(r'^ *0x[0-9a-fA-F][0-9a-fA-F]'
+				     r'(?: *, *0x[0-9a-fA-F][0-9a-fA-F])* *$')
+
 	@classmethod
 	def __parseByteArray(cls, byteText):
-		data = byteText.split(",")
-		data = [ cls.__parseNum(d) for d in data ]
-		return bytes(bytearray(data))
+		if cls._reHexByteArray.match(byteText):
+			# Fast path: Let fromhex() convert all bytes at once.
+			return bytes(bytearray.fromhex(
+				byteText.replace("0x", "").replace(",", " ")))
+		# This is __parseNum() inlined for each byte.
+		data = bytearray()
+		for numText in byteText.split(","):
+			numText = numText.strip()
+			if numText.startswith("0x"):
+				data.append(int(numText[2:], 16))
+			else:
+				data.append(int(numText, 10))
+		return bytes(data)
+
+	@classmethod
+	def __matchField(cls, text, reVal, name, hasOffset = False):
+		"""Match a simple field line.
+		Returns the match object or None.
+		"""
+		key = (reVal, name, hasOffset)
+		field = cls._reFieldCache.get(key)
+		if field is None:
+			regex = re.compile(r'^' + name +\
+					   ((r'\s*\(\s*(' + cls._reNum + r')\s*\)\s*')\
+					    if hasOffset else r'\s*') +\
+					   reVal)
+			# The name is used as regex. Only the part
+			# up to the first dot is a literal prefix.
+			field = cls._reFieldCache[key] = (name.split(".", 1)[0], regex)
+		prefix, regex = field
+		if not text.startswith(prefix):
+			return None
+		return regex.match(text)
 
 	def __trySimpleNum(self, line, name, hasOffset = False):
-		m = re.match(r'^' + name +\
-			     ((r'\s*\(\s*(' + self._reNum + r')\s*\)\s*')\
-			      if hasOffset else r'\s*') +\
-			     r'=\s*(' + self._reNum + r')$',
-			     line.text)
+		m = self.__matchField(line.text, self._reValNum, name, hasOffset)
 		offset, value = None, None
 		if m:
 			try:
@@ -276,11 +324,7 @@ class GsdParser(object):
 		return None
 
 	def __trySimpleStr(self, line, name, hasOffset = False):
-		m = re.match(r'^' + name +\
-			     ((r'\s*\(\s*(' + self._reNum + r')\s*\)\s*')\
-			      if hasOffset else r'\s*') +\
-			     r'=\s*"(' + self._reStr + r')"$',
-			     line.text)
+		m = self.__matchField(line.text, self._reValStr, name, hasOffset)
 		offset, value = None, None
 		if m:
 			if hasOffset:
@@ -298,18 +342,13 @@ class GsdParser(object):
 		return (offset, value) if hasOffset else value
 
 	def __tryStrNoQuotes(self, line, name):
-		m = re.match(r'^' + name + r'\s*=\s*(.*)$',
-			     line.text)
+		m = self.__matchField(line.text, self._reValAny, name)
 		if m:
 			return m.group(1)
 		return None
 
 	def __tryByteArray(self, line, name, hasOffset = False):
-		m = re.match(r'^' + name +\
-			     ((r'\s*\(\s*(' + self._reNum + r')\s*\)\s*')\
-			      if hasOffset else r'\s*') +\
-			     r'=\s*(.*)$',
-			     line.text)
+		m = self.__matchField(line.text, self._reValAny, name, hasOffset)
 		offset, data = None, None
 		if m:
 			try:
@@ -322,28 +361,120 @@ class GsdParser(object):
 				self.__parseErr(line, "%s invalid" % name)
 		return (offset, data) if hasOffset else data
 
-	def __parseLine_global(self, line):
-		# Parse simple numbers.
-		for name in ("GSD_Revision", "Ident_Number",
-			     "Protocol_Ident", "Station_Type",
-			     "Repeater_Ctrl_Sig", "24V_Pins",
-			     "S7HeaderCnf", "OffsetFirstMPDBlock",
-			     "ETERDelay", "MaxResponseDelay",
-			     "Min_Slave_Intervall", "Max_Diag_Data_Len",
-			     "Modul_Offset", "Max_Module",
-			     "Max_Input_Len", "Max_Output_Len",
-			     "Max_Data_Len", "MaxTsdr_9.6", "MaxTsdr_19.2",
-			     "MaxTsdr_45.45", "MaxTsdr_93.75", "MaxTsdr_187.5",
-			     "MaxTsdr_500", "MaxTsdr_1.5M", "MaxTsdr_3M",
-			     "MaxTsdr_6M", "MaxTsdr_12M", "User_Prm_Data_Len",
-			     "Max_User_Prm_Data_Len"):
-			value = self.__trySimpleNum(line, name)
-			if value is not None:
-				self.__fields[name] = value
-				return
+	@staticmethod
+	def __getFieldName(line):
+		"""Get the field name at the start of a line.
+		"""
+		return line.text.split("=", 1)[0].split("(", 1)[0].rstrip()
 
-		# Parse simple booleans.
-		for name in ("Freeze_Mode_supp", "Sync_Mode_supp",
+	def __parseGlobal_num(self, line, name):
+		value = self.__trySimpleNum(line, name)
+		if value is None:
+			return False
+		self.__fields[name] = value
+		return True
+
+	def __parseGlobal_bool(self, line, name):
+		value = self.__trySimpleBool(line, name)
+		if value is None:
+			return False
+		self.__fields[name] = value
+		return True
+
+	def __parseGlobal_str(self, line, name):
+		value = self.__trySimpleStr(line, name)
+		if value is None:
+			return False
+		self.__fields[name] = value
+		return True
+
+	def __parseGlobal_prmText(self, line, name):
+		value = self.__trySimpleNum(line, name)
+		if value is None:
+			return False
+		self.__fields.setdefault(name, []).append(
+			PrmText(value))
+		self.__state = self._STATE_PRMTEXT
+		return True
+
+	def __parseGlobal_slaveFamily(self, line, name):
+		value = self.__tryStrNoQuotes(line, name)
+		if value is None:
+			return False
+		self.__fields[name] = value.split("@")
+		return True
+
+	def __parseGlobal_userPrmData(self, line, name):
+		value = self.__tryByteArray(line, name)
+		if value is None:
+			return False
+		self.__fields[name] = value
+		return True
+
+	def __parseGlobal_extUserPrmData(self, line, name):
+		m = self._reExtUserPrmData.match(line.text)
+		if not m:
+			return False
+		try:
+			refNr = self.__parseNum(m.group(1))
+			name = m.group(2)
+			self.__fields.setdefault("ExtUserPrmData", []).append(
+				ExtUserPrmData(refNr, name))
+			self.__state = self._STATE_EXTUSERPRMDATA
+		except ValueError as e:
+			self.__parseErr(line, "ExtUserPrmData invalid")
+		return True
+
+	def __parseGlobal_extUserPrmDataConst(self, line, name):
+		offset, value = self.__tryByteArray(line, name,
+						    hasOffset = True)
+		if value is None:
+			return False
+		self.__fields.setdefault(name, []).append(
+			ExtUserPrmDataConst(offset, value))
+		return True
+
+	def __parseGlobal_extUserPrmDataRef(self, line, name):
+		offset, value = self.__trySimpleNum(line, name,
+						    hasOffset = True)
+		if value is None:
+			return False
+		self.__fields.setdefault(name, []).append(
+			ExtUserPrmDataRef(offset, value))
+		return True
+
+	def __parseGlobal_module(self, line, name):
+		m = self._reModule.match(line.text)
+		if not m:
+			return False
+		try:
+			name = m.group(1)
+			config = m.group(2)
+			configBytes = self.__parseByteArray(config)
+			self.__fields.setdefault("Module", []).append(
+				Module(name, configBytes))
+			self.__state = self._STATE_MODULE
+		except ValueError as e:
+			self.__parseErr(line, "Module invalid")
+		return True
+
+	# Simple numbers.
+	_globalNumFields = ("GSD_Revision", "Ident_Number",
+			    "Protocol_Ident", "Station_Type",
+			    "Repeater_Ctrl_Sig", "24V_Pins",
+			    "S7HeaderCnf", "OffsetFirstMPDBlock",
+			    "ETERDelay", "MaxResponseDelay",
+			    "Min_Slave_Intervall", "Max_Diag_Data_Len",
+			    "Modul_Offset", "Max_Module",
+			    "Max_Input_Len", "Max_Output_Len",
+			    "Max_Data_Len", "MaxTsdr_9.6", "MaxTsdr_19.2",
+			    "MaxTsdr_45.45", "MaxTsdr_93.75", "MaxTsdr_187.5",
+			    "MaxTsdr_500", "MaxTsdr_1.5M", "MaxTsdr_3M",
+			    "MaxTsdr_6M", "MaxTsdr_12M", "User_Prm_Data_Len",
+			    "Max_User_Prm_Data_Len")
+
+	# Simple booleans.
+	_globalBoolFields = ("Freeze_Mode_supp", "Sync_Mode_supp",
 			     "Set_Slave_Add_supp", "Redundancy",
 			     "IsActive", "OnlyNormalModules",
 			     "DiagBufferable", "Fail_Safe",
@@ -352,74 +483,51 @@ class GsdParser(object):
 			     "93.75_supp", "187.5_supp", "500_supp",
 			     "1.5M_supp", "3M_supp", "6M_supp",
 			     "12M_supp", "FixPresetModules",
-			     "DPV1_Slave"):
-			value = self.__trySimpleBool(line, name)
-			if value is not None:
-				self.__fields[name] = value
-				return
-
-		# Parse simple strings.
-		for name in ("Vendor_Name", "Model_Name",
-			     "Revision", "Hardware_Release",
-			     "Software_Release", "Implementation_Type",
-			     "Bitmap_Device", "Bitmap_SF",
-			     "OrderNumber", "Periphery"):
-			value = self.__trySimpleStr(line, name)
-			if value is not None:
-				self.__fields[name] = value
-				return
+			     "DPV1_Slave")
+
+	# Simple strings.
+	_globalStrFields = ("Vendor_Name", "Model_Name",
+			    "Revision", "Hardware_Release",
+			    "Software_Release", "Implementation_Type",
+			    "Bitmap_Device", "Bitmap_SF",
+			    "OrderNumber", "Periphery")
+
+	# The global line parsers in the order they are tried.
+	_globalParsers = (tuple(zip(_globalNumFields,
+				    (__parseGlobal_num, ) * len(_globalNumFields))) +
+			  tuple(zip(_globalBoolFields,
+				    (__parseGlobal_bool, ) * len(_globalBoolFields))) +
+			  tuple(zip(_globalStrFields,
+				    (__parseGlobal_str, ) * len(_globalStrFields))) +
+			  (("PrmText", __parseGlobal_prmText),
+			   ("Slave_Family", __parseGlobal_slaveFamily),
+			   ("User_Prm_Data", __parseGlobal_userPrmData),
+			   ("ExtUserPrmData", __parseGlobal_extUserPrmData),
+			   ("Ext_User_Prm_Data_Const", __parseGlobal_extUserPrmDataConst),
+			   ("Ext_User_Prm_Data_Ref", __parseGlobal_extUserPrmDataRef),
+			   ("Module", __parseGlobal_module)))
+
+	# The global line parsers by field name.
+	_globalParsersByName = dict(_globalParsers)
+
+	# The global line parsers for names containing a dot.
+	# The dot is not escaped in the field regexes, so these may
+	# also match a line with a different field name.
+	_globalWildcardParsers = tuple(p for p in _globalParsers if "." in p[0])
 
-		# Parse specials
-		value = self.__trySimpleNum(line, "PrmText")
-		if value is not None:
-			self.__fields.setdefault("PrmText", []).append(
-				PrmText(value))
-			self.__state = self._STATE_PRMTEXT
-			return
-		value = self.__tryStrNoQuotes(line, "Slave_Family")
-		if value is not None:
-			self.__fields["Slave_Family"] = value.split("@")
-			return
-		value = self.__tryByteArray(line, "User_Prm_Data")
-		if value is not None:
-			self.__fields["User_Prm_Data"] = value
-			return
-		m = self._reExtUserPrmData.match(line.text)
-		if m:
-			try:
-				refNr = self.__parseNum(m.group(1))
-				name = m.group(2)
-				self.__fields.setdefault("ExtUserPrmData", []).append(
-					ExtUserPrmData(refNr, name))
-				self.__state = self._STATE_EXTUSERPRMDATA
-			except ValueError as e:
-				self.__parseErr(line, "ExtUserPrmData invalid")
-			return
-		offset, value = self.__tryByteArray(line, "Ext_User_Prm_Data_Const",
-						    hasOffset = True)
-		if value is not None:
-			self.__fields.setdefault("Ext_User_Prm_Data_Const", []).append(
-				ExtUserPrmDataConst(offset, value))
-			return
-		offset, value = self.__trySimpleNum(line, "Ext_User_Prm_Data_Ref",
-						    hasOffset = True)
-		if value is not None:
-			self.__fields.setdefault("Ext_User_Prm_Data_Ref", []).append(
-				ExtUserPrmDataRef(offset, value))
-			return
-		m = self._reModule.match(line.text)
-		if m:
-			try:
-				name = m.group(1)
-				config = m.group(2)
-				configBytes = self.__parseByteArray(config)
-				self.__fields.setdefault("Module", []).append(
-					Module(name, configBytes))
-				self.__state = self._STATE_MODULE
-			except ValueError as e:
-				self.__parseErr(line, "Module invalid")
+	def __parseLine_global(self, line):
+		# Try the parser for the field name first.
+		name = self.__getFieldName(line)
+		tryParse = self._globalParsersByName.get(name)
+		if tryParse is not None and tryParse(self, line, name):
 			return
 
+		# Unknown field name or invalid line.
+		# Only the parsers for names with a dot may still match.
+		for name, tryParse in self._globalWildcardParsers:
+			if tryParse(self, line, name):
+				return
+
 		self.__parseWarn(line, "Ignored unknown line")
 
 	def __parseLine_prmText(self, line):
@@ -461,8 +569,13 @@ class GsdParser(object):
 
 		module = self.__fields["Module"][-1]
 
+		# Only the parser for the field name can match.
+		fieldName = self.__getFieldName(line)
+
 		# Parse simple numbers.
 		for name in ("Ext_Module_Prm_Data_Len", ):
+			if fieldName != name:
+				continue
 			value = self.__trySimpleNum(line, name)
 			if value is not None:
 				module.fields[name] = value
@@ -470,24 +583,28 @@ class GsdParser(object):
 
 		# Parse simple booleans.
 		for name in ("Preset", ):
+			if fieldName != name:
+				continue
 			value = self.__trySimpleBool(line, name)
 			if value is not None:
 				module.fields[name] = value
 				return
 
 		# Parse specials
-		offset, value = self.__tryByteArray(line, "Ext_User_Prm_Data_Const",
-						    hasOffset = True)
-		if value is not None:
-			module.fields.setdefault("Ext_User_Prm_Data_Const", []).append(
-				ExtUserPrmDataConst(offset, value))
-			return
-		offset, value = self.__trySimpleNum(line, "Ext_User_Prm_Data_Ref",
-						    hasOffset = True)
-		if value is not None:
-			module.fields.setdefault("Ext_User_Prm_Data_Ref", []).append(
-				ExtUserPrmDataRef(offset, value))
-			return
+		if fieldName == "Ext_User_Prm_Data_Const":
+			offset, value = self.__tryByteArray(line, fieldName,
+							    hasOffset = True)
+			if value is not None:
+				module.fields.setdefault(fieldName, []).append(
+					ExtUserPrmDataConst(offset, value))
+				return
+		elif fieldName == "Ext_User_Prm_Data_Ref":
+			offset, value = self.__trySimpleNum(line, fieldName,
+							    hasOffset = True)
+			if value is not None:
+				module.fields.setdefault(fieldName, []).append(
+					ExtUserPrmDataRef(offset, value))
+				return
 
 		self.__parseWarn(line, "Ignored unknown line")
 
@@ -500,17 +617,15 @@ class GsdParser(object):
 
 		self.__state = self._STATE_GLOBAL
 
+		# Line parsers, indexed by _STATE_...
+		parseLine = (
+			self.__parseLine_global,
+			self.__parseLine_prmText,
+			self.__parseLine_extUserPrmData,
+			self.__parseLine_module,
+		)
 		for line in lines:
-			if self.__state == self._STATE_GLOBAL:
-				self.__parseLine_global(line)
-			elif self.__state == self._STATE_PRMTEXT:
-				self.__parseLine_prmText(line)
-			elif self.__state == self._STATE_EXTUSERPRMDATA:
-				self.__parseLine_extUserPrmData(line)
-			elif self.__state == self._STATE_MODULE:
-				self.__parseLine_module(line)
-			else:
-				assert(0)
+			parseLine[self.__state](line)
 
 	def getField(self, name, default = None):
 		"""Get a field by name.
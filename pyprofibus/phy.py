@@ -73,7 +73,7 @@ class CpPhy(object):
 
 	def __close(self):
 		self.__txQueueDAs = deque()
-		self.__txQueueTelegrams = [None] * (0x7F + 1)
+		self.__txQueueTelegrams = {}
 		self.__allocUntil = monotonic_time()
 		self.__secPerFrame = 0.0
 
@@ -101,12 +101,12 @@ class CpPhy(object):
 			self.__send()
 		return self.pollData(timeout)
 
-	def __send(self):
-		now = monotonic_time()
+	def __send(self, now=None):
+		if now is None:
+			now = monotonic_time()
 		if self.__canAllocateBus(now):
 			da = self.__txQueueDAs.popleft()
-			telegram, srd, maxReplyLen = self.__txQueueTelegrams[da]
-			self.__txQueueTelegrams[da] = None
+			telegram, srd, maxReplyLen = self.__txQueueTelegrams.pop(da)
 			telegramData = telegram.getRawData()
 			self.__allocateBus(now, len(telegramData), maxReplyLen)
 			self.sendData(telegramData, srd)
@@ -116,7 +116,7 @@ class CpPhy(object):
 			maxReplyLen = 255
 
 		da = telegram.da
-		if self.__txQueueTelegrams[da] is None:
+		if da not in self.__txQueueTelegrams:
 			self.__txQueueDAs.append(da)
 		self.__txQueueTelegrams[da] = (telegram, srd, maxReplyLen)
 
@@ -133,22 +133,22 @@ class CpPhy(object):
 		return now >= self.__allocUntil
 
 	def __allocateBus(self, now, nrSendOctets, nrReplyOctets):
-		secPerFrame = self.__secPerFrame
-		seconds = secPerFrame * nrSendOctets
 		if nrReplyOctets:
 			pass#TODO IFS
-			seconds += secPerFrame * nrReplyOctets
 		pass#TODO
+		# The send and reply octets take the same time per frame.
+		seconds = self.__secPerFrame * (nrSendOctets + nrReplyOctets)
 		self.__allocUntil = now + seconds
 
 	def releaseBus(self):
-		self.__allocUntil = monotonic_time()
+		now = self.__allocUntil = monotonic_time()
 		if self.__txQueueDAs:
-			self.__send()
+			# The bus is free now. Don't read the clock again.
+			self.__send(now)
 
 	def clearTxQueueAddr(self, da):
 		"""Remove all TX queue entries for the given destination address.
 		"""
-		if da in self.__txQueueDAs:
+		# The DA is queued, if and only if it has a queued telegram.
+		if self.__txQueueTelegrams.pop(da, None) is not None:
 			self.__txQueueDAs.remove(da)
-		self.__txQueueTelegrams[da] = None
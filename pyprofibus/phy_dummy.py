@@ -16,25 +16,42 @@ from pyprofibus.fdl import *
 from pyprofibus.dp import *
 from pyprofibus.util import *
 
+from collections import deque
+
 __all__ = [
 	"CpPhyDummySlave",
 ]
 
+# Bit inversion table for bytearray.translate().
+# Micropython doesn't have bytearray.translate().
+_invertTable = None if isMicropython else\
+	       bytes(bytearray(0xFF - i for i in range(256)))
+
 class CpPhyDummySlave(CpPhy):
 	"""Dummy slave PROFIBUS CP PHYsical layer
+	Keyword arguments:
+	echoDX: Reply to Data_Exchange with the inverted output data.
+	echoDXSize: Pad or truncate the Data_Exchange reply to this size.
+	mockReplies: If False, don't parse the sent telegrams. Answer
+		     every SRD with a short acknowledge instead.
 	"""
 
 	__slots__ = (
 		"__echoDX",
 		"__echoDXSize",
+		"__mockReplies",
 		"__pollQueue",
 	)
 
+	# The short acknowledge is always the same. Build it only once.
+	__ackData = FdlTelegram_ack().getRawData()
+
 	def __init__(self, *args, **kwargs):
 		super(CpPhyDummySlave, self).__init__(*args, **kwargs)
 		self.__echoDX = kwargs.get("echoDX", True)
 		self.__echoDXSize = kwargs.get("echoDXSize", None)
-		self.__pollQueue = []
+		self.__mockReplies = kwargs.get("mockReplies", True)
+		self.__pollQueue = deque()
 
 	def __msg(self, message):
 		if self.debug:
@@ -43,16 +60,19 @@ class CpPhyDummySlave(CpPhy):
 	def close(self):
 		"""Close the PHY device.
 		"""
-		self.__pollQueue = []
+		self.__pollQueue = deque()
 		super(CpPhyDummySlave, self).close()
 
 	def sendData(self, telegramData, srd):
 		"""Send data to the physical line.
 		"""
-		telegramData = bytearray(telegramData)
-		self.__msg("Sending %s  %s" % ("SRD" if srd else "SDN",
-					       bytesToHex(telegramData)))
-		self.__mockSend(telegramData, srd = srd)
+		if self.debug:
+			self.__msg("Sending %s  %s" % ("SRD" if srd else "SDN",
+						       bytesToHex(telegramData)))
+		if self.__mockReplies:
+			self.__mockSend(telegramData, srd = srd)
+		elif srd:
+			self.__pollQueue.append(bytearray(self.__ackData))
 
 	def pollData(self, timeout=0.0):
 		"""Poll received data from the physical line.
@@ -61,15 +81,16 @@ class CpPhyDummySlave(CpPhy):
 			   negative = unlimited.
 		"""
 		try:
-			telegramData = self.__pollQueue.pop(0)
+			telegramData = self.__pollQueue.popleft()
 		except IndexError as e:
 			return None
-		self.__msg("Receiving    %s" % bytesToHex(telegramData))
+		if self.debug:
+			self.__msg("Receiving    %s" % bytesToHex(telegramData))
 		return telegramData
 
 	def setConfig(self, baudrate=CpPhy.BAUD_9600, *args, **kwargs):
 		self.__msg("Baudrate = %d" % baudrate)
-		self.__pollQueue = []
+		self.__pollQueue = deque()
 		super(CpPhyDummySlave, self).setConfig(baudrate=baudrate, *args, **kwargs)
 
 	def __mockSend(self, telegramData, srd):
@@ -93,16 +114,17 @@ class CpPhyDummySlave(CpPhy):
 				self.__pollQueue.append(telegram.toFdlTelegram().getRawData())
 				return
 			if DpTelegram_SetPrm_Req.checkType(dp):
-				telegram = FdlTelegram_ack()
-				self.__pollQueue.append(telegram.getRawData())
+				self.__pollQueue.append(bytearray(self.__ackData))
 				return
 			if DpTelegram_ChkCfg_Req.checkType(dp):
-				telegram = FdlTelegram_ack()
-				self.__pollQueue.append(telegram.getRawData())
+				self.__pollQueue.append(bytearray(self.__ackData))
 				return
 			if DpTelegram_DataExchange_Req.checkType(dp):
 				if self.__echoDX:
-					du = bytearray([ d ^ 0xFF for d in dp.du ])
+					if _invertTable is None:
+						du = bytearray([ d ^ 0xFF for d in dp.du ])
+					else:
+						du = bytearray(dp.du).translate(_invertTable)
 					if self.__echoDXSize is not None:
 						if len(du) > self.__echoDXSize:
 							du = du[ : self.__echoDXSize]
@@ -113,8 +135,7 @@ class CpPhyDummySlave(CpPhy):
 									       du = du)
 					self.__pollQueue.append(telegram.toFdlTelegram().getRawData())
 				else:
-					telegram = FdlTelegram_ack()
-					self.__pollQueue.append(telegram.getRawData())
+					self.__pollQueue.append(bytearray(self.__ackData))
 				return
 
 			self.__msg("Dropping SRD telegram: %s" % str(fdl))
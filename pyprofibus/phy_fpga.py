@@ -87,13 +87,16 @@ class CpPhyFPGA(CpPhy):
 			if self.__rxDeque:
 				telegramData = self.__rxDeque.popleft()
 			else:
-				timeoutStamp = monotonic_time() + timeout#TODO
+				# TODO: pass timeout to telegramReceive()
 				telegramDataList = self.__driver.telegramReceive()
 				count = len(telegramDataList)
-				if count >= 1:
+				if count == 1:
 					telegramData = telegramDataList[0]
-					if count >= 2:
-						self.__rxDeque.extend(telegramDataList[1:])
+				elif count >= 2:
+					# Queue all and take the first one.
+					# This avoids slicing the list.
+					self.__rxDeque.extend(telegramDataList)
+					telegramData = self.__rxDeque.popleft()
 		except FpgaPhyError as e:
 			self.__tryRestartDriver(e)
 			telegramData = None
@@ -158,11 +158,14 @@ class FpgaPhyDriver(object):
 		"""Transfer a control message and wait for a reply.
 		"""
 		self.__controlSend(ctrlMsg)
-		for j in range(50):
+		deadline = monotonic_time() + 0.5
+		while True:
 			for rxMsg in self.__controlReceive():
 				if rxMsg.ctrl == rxCtrlMsgId:
 					return rxMsg
-			time.sleep(0.01)
+			if monotonic_time() >= deadline:
+				break
+			self.__ioProc.controlWait(0.01)
 		return None
 
 	def __controlSend(self, ctrlMsg):
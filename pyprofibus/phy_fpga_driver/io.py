@@ -36,6 +36,7 @@ class FpgaPhyProc(multiprocessing.Process):
 	EVENT_NOMAGIC			= 3
 	EVENT_INVALLEN			= 4
 	EVENT_PBLENERR			= 5
+	NR_EVENTS			= 6
 
 	# Offsets into __shmStatus
 	STATUS_RUNNING			= 0x0
@@ -72,12 +73,7 @@ class FpgaPhyProc(multiprocessing.Process):
 		self.__rxCtrlRdOffs = 0
 		self.__txCtrlWrOffs = 0
 		self.__txDataWrOffs = 0
-		self.__eventCountNewStat = 0
-		self.__eventCountReset = 0
-		self.__eventCountParErr = 0
-		self.__eventCountNoMagic = 0
-		self.__eventCountInvalLen = 0
-		self.__eventCountPBLenErr = 0
+		self.__eventCounts = bytes(bytearray(self.NR_EVENTS))
 
 		self.__spiDev = spiDev
 		self.__spiChipSelect = spiChipSelect
@@ -98,6 +94,9 @@ class FpgaPhyProc(multiprocessing.Process):
 		self.__shmRxCtrl = makeSHM(self.__shmLengths)
 		self.__shmStatus = makeSHM(self.__shmLengths)
 
+		# Set by the I/O process on each received control message.
+		self.__ctrlRxEvent = multiprocessing.Event()
+
 	def start(self):
 		super(FpgaPhyProc, self).start()
 		success = False
@@ -117,6 +116,28 @@ class FpgaPhyProc(multiprocessing.Process):
 	def __incShmStatus(self, index):
 		self.__shmStatus[index] = (self.__shmStatus[index] + 1) & 0xFF
 
+	@staticmethod
+	def __shmWrite(shm, offset, data):
+		"""Write data to the SHM ring buffer at offset.
+		This copies the data in at most two slices.
+		"""
+		length = len(data)
+		firstLen = min(length, len(shm) - offset)
+		shm[offset : offset + firstLen] = bytes(data[ : firstLen])
+		if firstLen < length:
+			shm[0 : length - firstLen] = bytes(data[firstLen : ])
+
+	@staticmethod
+	def __shmRead(shm, offset, length):
+		"""Read length bytes from the SHM ring buffer at offset.
+		This copies the data in at most two slices.
+		"""
+		firstLen = min(length, len(shm) - offset)
+		data = shm[offset : offset + firstLen]
+		if firstLen < length:
+			data += shm[0 : length - firstLen]
+		return data
+
 	def __ioProcMainLoop(self, spi):
 		ctrlWrOffs = 0
 		ctrlRdOffs = 0
@@ -143,9 +164,9 @@ class FpgaPhyProc(multiprocessing.Process):
 			# Get the TX control data, if any.
 			if txCtrlCount != self.__shmStatus[self.STATUS_CTRL_TXCOUNT]:
 				# Get the TX control message.
-				txData = bytearray(CTRL_LEN)
-				for i in range(CTRL_LEN):
-					txData[i] = self.__shmTxCtrl[(ctrlRdOffs + i) & shmMask]
+				txData = bytearray(self.__shmRead(self.__shmTxCtrl,
+								  ctrlRdOffs,
+								  CTRL_LEN))
 
 				ctrlRdOffs = (ctrlRdOffs + CTRL_LEN) & shmMask
 				txCtrlCount = (txCtrlCount + 1) & 0xFF
@@ -157,12 +178,13 @@ class FpgaPhyProc(multiprocessing.Process):
 				dataRdLen = self.__shmTxDataMeta[(metaBegin + self.META_LEN) & shmMask]
 
 				# Construct the TX data message.
-				txData = bytearray(dataRdLen + 2)
+				txData = bytearray(2)
 				txData[0] = FpgaPhyMsg.SPI_MS_MAGIC
 				txData[1] = 1 << FpgaPhyMsg.SPI_FLG_START
 				txData[1] |= FpgaPhyMsg.parity(txData[1]) << FpgaPhyMsg.SPI_FLG_PARITY
-				for i in range(dataRdLen):
-					txData[i + 2] = self.__shmTxData[(dataRdOffs + i) & shmMask]
+				txData += self.__shmRead(self.__shmTxData,
+							 dataRdOffs & shmMask,
+							 dataRdLen)
 
 				txDataCount = (txDataCount + 1) & 0xFF
 
@@ -216,12 +238,13 @@ class FpgaPhyProc(multiprocessing.Process):
 					rxData += bytes(spi.xfer2(FpgaPhyMsg.PADDING_BYTE * (CTRL_LEN - len(rxData))))
 
 				# Write the control message to SHM.
-				for i in range(CTRL_LEN):
-					self.__shmRxCtrl[(ctrlWrOffs + i) & shmMask] = rxData[i]
+				self.__shmWrite(self.__shmRxCtrl, ctrlWrOffs,
+						rxData[ : CTRL_LEN])
 				ctrlWrOffs = (ctrlWrOffs + CTRL_LEN) & shmMask
 
 				# Update the receive count in SHM.
 				self.__incShmStatus(self.STATUS_CTRL_RXCOUNT)
+				self.__ctrlRxEvent.set()
 
 				# If there is data left, add it to tail data.
 				tailData = rxData[CTRL_LEN : ]
@@ -270,8 +293,8 @@ class FpgaPhyProc(multiprocessing.Process):
 						self.__incShmStatus(self.STATUS_EVENTCOUNT_INVALLEN)
 
 					# Write the telegram to SHM.
-					for i in range(expectedRxLength):
-						self.__shmRxData[(dataWrOffs + i) & shmMask] = rxDataBuf[i]
+					self.__shmWrite(self.__shmRxData, dataWrOffs,
+							rxDataBuf[ : expectedRxLength])
 
 					# Update receive telegram metadata in SHM.
 					count = self.__shmStatus[self.STATUS_DATA_RXCOUNT]
@@ -331,8 +354,7 @@ class FpgaPhyProc(multiprocessing.Process):
 		metaBegin = txCount * self.METASTRUCT_SIZE
 
 		dataWrOffs = self.__txDataWrOffs
-		for i in range(txLength):
-			self.__shmTxData[(dataWrOffs + i) & shmMask] = txTelegramData[i]
+		self.__shmWrite(self.__shmTxData, dataWrOffs, txTelegramData)
 
 		self.__shmTxDataMeta[(metaBegin + self.META_OFFS_LO) & shmMask] = dataWrOffs & 0xFF
 		self.__shmTxDataMeta[(metaBegin + self.META_OFFS_HI) & shmMask] = (dataWrOffs >> 8) & 0xFF
@@ -352,9 +374,9 @@ class FpgaPhyProc(multiprocessing.Process):
 			dataRdOffs |= self.__shmRxDataMeta[(metaBegin + self.META_OFFS_HI) & shmMask] << 8
 			dataRdLen = self.__shmRxDataMeta[(metaBegin + self.META_LEN) & shmMask]
 
-			rxData = bytearray(dataRdLen)
-			for i in range(dataRdLen):
-				rxData[i] = self.__shmRxData[(dataRdOffs + i) & shmMask]
+			rxData = bytearray(self.__shmRead(self.__shmRxData,
+							  dataRdOffs & shmMask,
+							  dataRdLen))
 			rxTelegrams.append(rxData)
 
 			rxCount = (rxCount + 1) & 0xFF
@@ -371,8 +393,7 @@ class FpgaPhyProc(multiprocessing.Process):
 
 		ctrlData = ctrlMsg.toBytes()
 		ctrlWrOffs = self.__txCtrlWrOffs
-		for i in range(CTRL_LEN):
-			self.__shmTxCtrl[(ctrlWrOffs + i) & shmMask] = ctrlData[i]
+		self.__shmWrite(self.__shmTxCtrl, ctrlWrOffs, ctrlData[ : CTRL_LEN])
 
 		self.__shmStatus[self.STATUS_CTRL_TXCOUNT] = (txCount + 1) & 0xFF
 		self.__txCtrlWrOffs = (ctrlWrOffs + CTRL_LEN) & shmMask
@@ -385,9 +406,9 @@ class FpgaPhyProc(multiprocessing.Process):
 		rxCount = self.__rxCtrlCount
 		ctrlRdOffs = self.__rxCtrlRdOffs
 		while rxCount != newCount:
-			rxCtrl = bytearray(CTRL_LEN)
-			for i in range(CTRL_LEN):
-				rxCtrl[i] = self.__shmRxCtrl[(ctrlRdOffs + i) & shmMask]
+			rxCtrl = bytearray(self.__shmRead(self.__shmRxCtrl,
+							  ctrlRdOffs,
+							  CTRL_LEN))
 			rxCtrlMsgs.append(FpgaPhyMsgCtrl.fromBytes(rxCtrl))
 
 			ctrlRdOffs = (ctrlRdOffs + CTRL_LEN) & shmMask
@@ -399,24 +420,26 @@ class FpgaPhyProc(multiprocessing.Process):
 	def controlAvailable(self):
 		return self.__shmStatus[self.STATUS_CTRL_RXCOUNT] != self.__rxCtrlCount
 
+	def controlWait(self, timeout):
+		"""Wait up to timeout seconds for a received control message.
+		"""
+		# Clear the event before checking the SHM receive count.
+		# The I/O process sets it after updating the count.
+		self.__ctrlRxEvent.clear()
+		if not self.controlAvailable():
+			self.__ctrlRxEvent.wait(timeout)
+
 	def getEventStatus(self):
+		# Read all event counters at once.
+		# The event IDs are the counter indices.
+		counts = self.__shmStatus[self.STATUS_EVENTCOUNT_BASE :
+					  self.STATUS_EVENTCOUNT_BASE + self.NR_EVENTS]
+		prevCounts = self.__eventCounts
+		if counts == prevCounts:
+			return 0
+		self.__eventCounts = counts
 		events = 0
-		if self.__eventCountNewStat != self.__shmStatus[self.STATUS_EVENTCOUNT_NEWSTAT]:
-			self.__eventCountNewStat = self.__shmStatus[self.STATUS_EVENTCOUNT_NEWSTAT]
-			events |= 1 << self.EVENT_NEWSTAT
-		if self.__eventCountReset != self.__shmStatus[self.STATUS_EVENTCOUNT_RESET]:
-			self.__eventCountReset = self.__shmStatus[self.STATUS_EVENTCOUNT_RESET]
-			events |= 1 << self.EVENT_RESET
-		if self.__eventCountParErr != self.__shmStatus[self.STATUS_EVENTCOUNT_PARERR]:
-			self.__eventCountParErr = self.__shmStatus[self.STATUS_EVENTCOUNT_PARERR]
-			events |= 1 << self.EVENT_PARERR
-		if self.__eventCountNoMagic != self.__shmStatus[self.STATUS_EVENTCOUNT_NOMAGIC]:
-			self.__eventCountNoMagic = self.__shmStatus[self.STATUS_EVENTCOUNT_NOMAGIC]
-			events |= 1 << self.EVENT_NOMAGIC
-		if self.__eventCountInvalLen != self.__shmStatus[self.STATUS_EVENTCOUNT_INVALLEN]:
-			self.__eventCountInvalLen = self.__shmStatus[self.STATUS_EVENTCOUNT_INVALLEN]
-			events |= 1 << self.EVENT_INVALLEN
-		if self.__eventCountPBLenErr != self.__shmStatus[self.STATUS_EVENTCOUNT_PBLENERR]:
-			self.__eventCountPBLenErr = self.__shmStatus[self.STATUS_EVENTCOUNT_PBLENERR]
-			events |= 1 << self.EVENT_PBLENERR
+		for event in range(self.NR_EVENTS):
+			if counts[event] != prevCounts[event]:
+				events |= 1 << event
 		return events
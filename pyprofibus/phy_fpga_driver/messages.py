@@ -13,6 +13,8 @@ from pyprofibus.compat import *
 
 from pyprofibus.phy_fpga_driver.exceptions import *
 
+import struct
+
 
 __all__ = [
 	"FpgaPhyMsg",
@@ -20,6 +22,22 @@ __all__ = [
 ]
 
 
+def _makeCrc8Table(P):
+	"""Build the CRC-8 lookup table for the polynomial P.
+	"""
+	table = []
+	for data in range(256):
+		for i in range(8):
+			data = ((data << 1) ^ (P if (data & 0x80) else 0)) & 0xFF
+		table.append(data)
+	return tuple(table)
+
+def _makeParityTable():
+	"""Build the 8 bit odd parity lookup table.
+	"""
+	return tuple((bin(value).count("1") & 1) ^ 1
+		     for value in range(256))
+
 class FpgaPhyMsg(object):
 	SPI_MS_MAGIC	= 0xAA
 	SPI_SM_MAGIC	= 0x55
@@ -48,27 +66,24 @@ class FpgaPhyMsg(object):
 	SD4		= 0xDC
 	SC		= 0xE5
 
+	_crc8Table = _makeCrc8Table(CRC_POLYNOMIAL)
+	_parityTable = _makeParityTable()
+
 	@staticmethod
 	def crc8(dataBytes, crc=0xFF, P=CRC_POLYNOMIAL):
+		if P == FpgaPhyMsg.CRC_POLYNOMIAL:
+			table = FpgaPhyMsg._crc8Table
+		else:
+			table = _makeCrc8Table(P)
 		for data in dataBytes:
-			data ^= crc
-			for i in range(8):
-				data = ((data << 1) ^ (P if (data & 0x80) else 0)) & 0xFF
-			crc = data
+			crc = table[data ^ crc]
 		return crc
 
 	@classmethod
 	def parity(cls, value):
 		"""Calculate odd parity on 8 bits.
 		"""
-		return ((value & 1) ^
-			((value >> 1) & 1) ^
-			((value >> 2) & 1) ^
-			((value >> 3) & 1) ^
-			((value >> 4) & 1) ^
-			((value >> 5) & 1) ^
-			((value >> 6) & 1) ^
-			((value >> 7) & 1) ^ 1)
+		return cls._parityTable[value & 0xFF]
 
 	@classmethod
 	def calcLen(cls, dataBytes):
@@ -117,42 +132,39 @@ class FpgaPhyMsgCtrl(FpgaPhyMsg):
 
 	CTRL_LEN = 8
 
+	# MAGIC, FLG, CTRL, big endian 32 bit CTRL-DATA and CRC.
+	_ctrlStruct = struct.Struct(">BBBIB")
+
 	def __init__(self, ctrl, ctrlData=0, flg=0):
 		self.flg = flg | (1 << self.SPI_FLG_CTRL)
 		self.ctrl = ctrl
 		self.ctrlData = ctrlData
 
 	def toBytes(self):
-		data = bytearray(8)
-		data[0] = self.SPI_MS_MAGIC
-		data[1] = 1 << self.SPI_FLG_CTRL
-		data[1] |= self.parity(data[1]) << self.SPI_FLG_PARITY
-		data[2] = self.ctrl & 0xFF
-		data[3] = (self.ctrlData >> 24) & 0xFF
-		data[4] = (self.ctrlData >> 16) & 0xFF
-		data[5] = (self.ctrlData >> 8) & 0xFF
-		data[6] = self.ctrlData & 0xFF
+		data = bytearray(self.CTRL_LEN)
+		flg = 1 << self.SPI_FLG_CTRL
+		flg |= self.parity(flg) << self.SPI_FLG_PARITY
+		self._ctrlStruct.pack_into(data, 0,
+					   self.SPI_MS_MAGIC,
+					   flg,
+					   self.ctrl & 0xFF,
+					   self.ctrlData & 0xFFFFFFFF,
+					   0)
 		data[7] = self.crc8(data[2:7])
 		return data
 
 	@classmethod
 	def fromBytes(cls, data):
-		if data[0] != cls.SPI_SM_MAGIC:
+		magic, flg, ctrl, ctrlData, crc = cls._ctrlStruct.unpack_from(data)
+		if magic != cls.SPI_SM_MAGIC:
 			raise FpgaPhyError("FPGA control message: "
 					   "Invalid MAGC field.")
-		flg = data[1]
 		if cls.parity(flg):
 			raise FpgaPhyError("FPGA control message: "
 					   "Invalid parity bit.")
 		if not (flg & (1 << cls.SPI_FLG_CTRL)):
 			raise FpgaPhyError("FPGA control message: "
 					   "CTRL bit is not set.")
-		ctrl = data[2]
-		ctrlData = data[3] << 24
-		ctrlData |= data[4] << 16
-		ctrlData |= data[5] << 8
-		ctrlData |= data[6]
-		crc = data[7]
 		crcExpected = cls.crc8(data[2:7])
 		if crc != crcExpected:
 			raise FpgaPhyError("FPGA control message: "
@@ -45,6 +45,7 @@ class CpPhySerial(CpPhy):
 	__slots__ = (
 		"__discardTimeout",
 		"__rxBuf",
+		"__rxSize",
 		"__serial",
 	)
 
@@ -58,6 +59,7 @@ class CpPhySerial(CpPhy):
 		super(CpPhySerial, self).__init__(*args, **kwargs)
 		self.__discardTimeout = None
 		self.__rxBuf = bytearray()
+		self.__rxSize = -1
 		try:
 			if useRS485Class:
 				if not hasattr(serial, "rs485"):
@@ -95,6 +97,7 @@ class CpPhySerial(CpPhy):
 		except serial.SerialException as e:
 			pass
 		self.__rxBuf = bytearray()
+		self.__rxSize = -1
 		super(CpPhySerial, self).close()
 
 	def __discard(self):
@@ -116,7 +119,9 @@ class CpPhySerial(CpPhy):
 		ret = None
 		rxBuf = self.__rxBuf
 		ser = self.__serial
-		size = -1
+		# The size of a partially received telegram is
+		# kept from the previous poll, if it's already known.
+		size = self.__rxSize
 		getSize = FdlTelegram.getSizeFromRaw
 
 		while self.__discardTimeout is not None:
@@ -154,6 +159,7 @@ class CpPhySerial(CpPhy):
 					ret = rxBuf
 					rxBuf = bytearray()
 					rxBufLen = 0
+					size = -1
 					break
 
 				if (timeout == 0.0 or
@@ -163,11 +169,13 @@ class CpPhySerial(CpPhy):
 			if self.debug and rxBuf:
 				self._debugMsg("RX (fragment)   %s" % bytesToHex(rxBuf))
 			rxBuf = bytearray()
+			size = -1
 			self.__startDiscard()
 			raise PhyError("PHY-serial: Failed to receive "
 				"telegram:\n" + str(e))
 		finally:
 			self.__rxBuf = rxBuf
+			self.__rxSize = size
 		if self.debug and ret:
 			self._debugMsg("RX   %s" % bytesToHex(ret))
 		return ret
@@ -204,6 +212,7 @@ class CpPhySerial(CpPhy):
 				self.__serial.dsrdtr = dsrdtr
 				self.__serial.open()
 				self.__rxBuf = bytearray()
+				self.__rxSize = -1
 		except (serial.SerialException, ValueError) as e:
 			raise PhyError("Failed to set CP-PHY "
 				"configuration:\n" + str(e))
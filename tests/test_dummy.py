@@ -65,3 +65,96 @@ class Test_DummyPhy(TestCase):
 				if j >= 5 and ret is not None:
 					break
 			self.assertEqual(bytearray(ret), bytearray([i ^ 0xFF, ]))
+
+	def test_dummy_phy_no_mock_replies(self):
+		phy = pyprofibus.phy_dummy.CpPhyDummySlave(debug=True,
+							   mockReplies=False)
+		phy.setConfig(baudrate=19200)
+
+		telegram = pyprofibus.dp.DpTelegram_SlaveDiag_Req(da=84, sa=42)
+		rawData = telegram.toFdlTelegram().getRawData()
+
+		# SRD is answered with a short acknowledge.
+		phy.sendData(rawData, srd=True)
+		self.assertEqual(phy.pollData(), bytearray([0xE5, ]))
+		self.assertIsNone(phy.pollData())
+
+		# SDN is not answered.
+		phy.sendData(rawData, srd=False)
+		self.assertIsNone(phy.pollData())
+
+	def test_dummy_phy_multi_slave(self):
+		phy = pyprofibus.phy_dummy.CpPhyDummySlave(debug=True, echoDX=True)
+		phy.setConfig(baudrate=19200)
+
+		class Master(pyprofibus.DPM1):
+			def __init__(self, *args, **kwargs):
+				self.stateLog = []
+				pyprofibus.DPM1.__init__(self, *args, **kwargs)
+
+			def _slaveStateChanged(self, slave, state):
+				pyprofibus.DPM1._slaveStateChanged(self, slave, state)
+				self.stateLog.append((slave.slaveDesc.slaveAddr, state))
+
+		master = Master(phy=phy,
+				masterAddr=42,
+				debug=True)
+
+		# The second slave shall be diagnosed periodically.
+		slaveDescs = []
+		for addr, diagPeriod in ((84, 0), (85, 5), (86, 0)):
+			conf = pyprofibus.conf.PbConf._SlaveConf()
+			conf.addr = addr
+			conf.inputSize = 1
+			conf.outputSize = 1
+			conf.diagPeriod = diagPeriod
+			slaveDesc = pyprofibus.dp_master.DpSlaveDesc(conf)
+			slaveDesc.setCfgDataElements([
+				pyprofibus.dp.DpCfgDataElement(pyprofibus.dp.DpCfgDataElement.ID_TYPE_OUT),
+				pyprofibus.dp.DpCfgDataElement(pyprofibus.dp.DpCfgDataElement.ID_TYPE_IN),
+			])
+			slaveDesc.setUserPrmData(bytearray([1, 2, 3, 4, ]))
+			master.addSlave(slaveDesc)
+			slaveDescs.append(slaveDesc)
+		master.initialize()
+
+		for i in range(200):
+			for slaveDesc in slaveDescs:
+				slaveDesc.setMasterOutData(bytearray([i & 0xFF, ]))
+			master.run()
+		for slaveDesc in slaveDescs:
+			self.assertFalse(slaveDesc.isConnecting())
+			self.assertTrue(slaveDesc.isConnected())
+
+		S = pyprofibus.dp_master.DpSlaveState
+		connectSequence = [ S.STATE_WDIAG, S.STATE_WPRM, S.STATE_WCFG,
+				    S.STATE_WDXRDY, S.STATE_DX, ]
+		def states(addr):
+			return [ state for a, state in master.stateLog if a == addr ]
+
+		# The slaves without diagPeriod stay in Data_Exchange.
+		self.assertEqual(states(84), connectSequence)
+		self.assertEqual(states(86), connectSequence)
+
+		# The slave with diagPeriod periodically goes through
+		# diagnosis back to Data_Exchange.
+		diagStates = states(85)
+		self.assertEqual(diagStates[ : len(connectSequence)], connectSequence)
+		periodic = diagStates[len(connectSequence) : ]
+		self.assertTrue(len(periodic) >= 4)
+		self.assertEqual(periodic,
+				 [ S.STATE_WDXRDY, S.STATE_DX, ] * (len(periodic) // 2))
+
+		# Check the dummy-slave responses to Data_Exchange.
+		for i in range(10):
+			for slaveDesc in slaveDescs:
+				j = 0
+				while True:
+					j += 1
+					self.assertTrue(j < 20)
+					slaveDesc.setMasterOutData(bytearray([i, ]))
+					master.run()
+					ret = slaveDesc.getMasterInData()
+					if j >= 5 and ret is not None:
+						break
+				self.assertEqual(bytearray(ret), bytearray([i ^ 0xFF, ]))
@@ -21,6 +21,43 @@ class Test_GSD(TestCase):
 		self.assertEqual(gsd.getIdentNumber(), 0x4224)
 		self.assertEqual(gsd.getUserPrmData(), bytearray([0x00, 0x00, 0x00, 0x42]))
 
+	def test_duplicate(self):
+		gsd = pyprofibus.gsd.GsdInterp.fromFile(os.path.join("misc", "dummy_modular.gsd"))
+		gsd.setConfiguredModule("dummy input module")
+		gsd.setConfiguredModule("dummy output module")
+
+		# The duplicate only has the preset modules configured.
+		dup = gsd.duplicate()
+		self.assertIsNot(dup, gsd)
+		self.assertEqual([ e.getDU()
+					for e in dup.getCfgDataElements() ],
+				 [ bytearray([0x00, ]), ])
+		self.assertEqual(dup.getIdentNumber(), 0x4224)
+		self.assertEqual(dup.getUserPrmData(), bytearray([0x00, 0x00, 0x00, 0x42]))
+
+		# Configuring the duplicate doesn't change the original.
+		dup.setConfiguredModule("dummy output module")
+		self.assertEqual([ e.getDU()
+					for e in dup.getCfgDataElements() ],
+				 [ bytearray([0x00, ]),
+				   bytearray([0x20, ]), ])
+		self.assertEqual([ e.getDU()
+					for e in gsd.getCfgDataElements() ],
+				 [ bytearray([0x00, ]),
+				   bytearray([0x10, ]),
+				   bytearray([0x20, ]), ])
+		self.assertEqual(gsd.getUserPrmData(), bytearray([0x00, 0x00, 0x00, 0x42]))
+
+		# Clearing the original doesn't change the duplicate.
+		gsd.clearConfiguredModules()
+		self.assertEqual([ e.getDU()
+					for e in gsd.getCfgDataElements() ],
+				 [ bytearray([0x00, ]), ])
+		self.assertEqual([ e.getDU()
+					for e in dup.getCfgDataElements() ],
+				 [ bytearray([0x00, ]),
+				   bytearray([0x20, ]), ])
+
 	def test_compact(self):
 		gsd = pyprofibus.gsd.GsdInterp.fromFile(os.path.join("misc", "dummy_compact.gsd"))
 		self.assertEqual([ e.getDU()